@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+# Batch script to run HomeMatch for many buyers offline
+
+import sys
+import argparse
+from pathlib import Path
+
+# Add project root to path to allow imports from other directories
+project_root = Path(__file__).parent
+sys.path.append(str(project_root))
+
+from models.home_match import HomeMatch
+
+def main():
+    """
+    Run HomeMatch in batch mode
+    """
+    parser = argparse.ArgumentParser(description="Run HomeMatch for buyer preference sets read from a JSONL file")
+    parser.add_argument("input_file", help="JSONL file with one {\"buyer_id\": ..., \"preferences\": [...]} per line")
+    parser.add_argument("output_dir", help="Directory for result files and the progress checkpoint")
+    parser.add_argument("--num-results", type=int, default=3, help="Number of results per buyer")
+    parser.add_argument("--workers", type=int, default=8, help="Number of buyers processed concurrently")
+    parser.add_argument("--format", choices=["parquet", "jsonl"], default="parquet", help="Output format")
+    parser.add_argument("--flush-every", type=int, default=100, help="Completed buyers per output file")
+    parser.add_argument("--no-personalize", action="store_true", help="Only search, skip personalization")
+    parser.add_argument("--index-backend", choices=["chroma", "ivf"], default="chroma", help="Vector search backend")
+    parser.add_argument("--nprobe", type=int, default=8, help="IVF lists scanned per query")
+    args = parser.parse_args()
+    
+    app = HomeMatch(index_backend=args.index_backend, nprobe=args.nprobe)
+    app.run_batch(
+        args.input_file,
+        args.output_dir,
+        num_results=args.num_results,
+        max_workers=args.workers,
+        personalize=not args.no_personalize,
+        output_format=args.format,
+        flush_every=args.flush_every
+    )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# Script to measure IVF recall@k and latency against exact search
+
+import sys
+import time
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+# Add project root to path to allow imports from other directories
+project_root = Path(__file__).parent
+sys.path.append(str(project_root))
+
+from models.ivf_index import IVFIndex, exact_search, normalize
+
+def synthetic_vectors(num_vectors, dim, num_clusters, seed):
+    """
+    Generate clustered unit vectors resembling text embeddings
+
+    Args:
+        num_vectors (int): Number of vectors
+        dim (int): Vector dimension
+        num_clusters (int): Number of underlying clusters
+        seed (int): Random seed
+
+    Returns:
+        np.ndarray: Normalized vectors
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(num_clusters, dim))
+    points = centers[rng.integers(0, num_clusters, num_vectors)] + 0.5 * rng.normal(size=(num_vectors, dim))
+    return normalize(points)
+
+def stored_vectors(persist_directory):
+    """
+    Load the embeddings stored in the vector database
+
+    Args:
+        persist_directory (str): Vector database directory
+
+    Returns:
+        np.ndarray: Normalized vectors
+    """
+    from models.vector_db import VectorDBManager
+    from utils.helpers import setup_environment
+
+    setup_environment()
+    _, embeddings = VectorDBManager(persist_directory=persist_directory).load_stored_embeddings()
+    return normalize(embeddings)
+
+def main():
+    """
+    Measure recall@k and per-query latency of the IVF index for several nprobe values
+    """
+    parser = argparse.ArgumentParser(description="Measure IVF recall@k against exact search")
+    parser.add_argument("--source", choices=["synthetic", "vectordb"], default="synthetic")
+    parser.add_argument("--persist-directory", default=str(project_root / "data" / "vectordb"))
+    parser.add_argument("--num-vectors", type=int, default=100000, help="Synthetic vectors to generate")
+    parser.add_argument("--dim", type=int, default=256, help="Synthetic vector dimension")
+    parser.add_argument("--clusters", type=int, default=500, help="Synthetic clusters")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nlist", type=int, default=None)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.source == "synthetic":
+        vectors = synthetic_vectors(args.num_vectors, args.dim, args.clusters, args.seed)
+    else:
+        vectors = stored_vectors(args.persist_directory)
+    ids = np.arange(len(vectors))
+
+    # Queries are perturbed copies of stored vectors
+    rng = np.random.default_rng(args.seed + 1)
+    queries = vectors[rng.integers(0, len(vectors), args.queries)]
+    queries = normalize(queries + 0.3 * rng.normal(size=queries.shape) / np.sqrt(vectors.shape[1]))
+
+    start = time.perf_counter()
+    index = IVFIndex(nlist=args.nlist)
+    index.build(vectors, ids)
+    print(f"Built IVF index: {len(vectors)} vectors, {index.nlist} lists, {time.perf_counter() - start:.2f}s")
+
+    start = time.perf_counter()
+    ground_truth = [set(exact_search(vectors, ids, query, args.k)[0]) for query in queries]
+    exact_ms = (time.perf_counter() - start) * 1000 / len(queries)
+    print(f"Exact search: {exact_ms:.3f} ms/query")
+
+    print(f"\n{'nprobe':>6}  {'recall@' + str(args.k):>9}  {'ms/query':>9}  {'speedup':>7}")
+    for nprobe in args.nprobe:
+        start = time.perf_counter()
+        results = [index.search(query, args.k, nprobe=nprobe)[0] for query in queries]
+        ivf_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+        recall = np.mean([len(truth.intersection(found)) / len(truth) for truth, found in zip(ground_truth, results)])
+        print(f"{nprobe:>6}  {recall:>9.3f}  {ivf_ms:>9.3f}  {exact_ms / ivf_ms:>6.1f}x")
+
+if __name__ == "__main__":
+    main()
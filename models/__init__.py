@@ -1,16 +1,29 @@
 # HomeMatch Models
 # This file makes the directory a Python package
 
+from .listing import Listing, ScoredListing
 from .listing_generator import ListingGenerator
+from .ivf_index import IVFIndex
+from .similarity_graph import SimilarityGraph
 from .vector_db import VectorDBManager
+from .constraint_extractor import ConstraintExtractor
 from .preference_manager import PreferenceManager
 from .listing_personalizer import ListingPersonalizer
+from .batch_runner import BatchRunner
+from .buyer_session import BuyerSession
 from .home_match import HomeMatch
 
 __all__ = [
+    'Listing',
+    'ScoredListing',
     'ListingGenerator',
+    'IVFIndex',
+    'SimilarityGraph',
     'VectorDBManager',
+    'ConstraintExtractor',
     'PreferenceManager',
     'ListingPersonalizer',
+    'BatchRunner',
+    'BuyerSession',
     'HomeMatch'
 ]
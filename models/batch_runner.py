@@ -0,0 +1,353 @@
+# Batch Runner Module
+# Responsible for running search and personalization for many buyers offline
+
+import os
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import pandas as pd
+from models.constraint_extractor import ConstraintExtractor
+from models.listing import LISTING_FIELDS
+
+class BatchRunner:
+    """
+    Class for processing buyer preference sets in bulk with a bounded worker pool.
+
+    Results are written in part files, each recorded in the checkpoint once it is on disk.
+    A part written just before a crash is recognized on the next run by its buyer ids, so
+    reruns never write the same buyer twice.
+    """
+
+    CHECKPOINT_FILE = "_checkpoint.jsonl"
+    PART_PREFIX = "part-"
+
+    def __init__(self, vector_db, listing_personalizer, num_results=3, max_workers=8,
+                 personalize=True, flush_every=100, output_format="parquet", use_constraints=True):
+        """
+        Initialize the BatchRunner.
+
+        Args:
+            vector_db (VectorDBManager): Vector database to search
+            listing_personalizer (ListingPersonalizer): Personalizer for matching listings
+            num_results (int): Number of results per buyer
+            max_workers (int): Number of buyers processed concurrently
+            personalize (bool): Whether to personalize descriptions (search only if False)
+            flush_every (int): Number of completed buyers per output file
+            output_format (str): Output format, either "parquet" or "jsonl"
+            use_constraints (bool): Whether to filter and boost results with extracted constraints
+        """
+        if output_format not in ("parquet", "jsonl"):
+            raise ValueError(f"Unsupported output format: {output_format}")
+
+        self.vector_db = vector_db
+        self.listing_personalizer = listing_personalizer
+        self.num_results = num_results
+        self.max_workers = max_workers
+        self.personalize = personalize
+        self.flush_every = flush_every
+        self.output_format = output_format
+        self.constraint_extractor = ConstraintExtractor() if use_constraints else None
+
+    def load_buyers(self, input_file):
+        """
+        Load buyer preference sets from a JSONL file
+
+        Each line is an object with "preferences" (list of answers) and an optional
+        "buyer_id"; buyers without an id are identified by their line number.
+
+        Args:
+            input_file (str): Path to the JSONL file
+
+        Returns:
+            list: List of buyer dictionaries with 'buyer_id' and 'preferences'
+        """
+        buyers = []
+        with open(input_file, 'r') as f:
+            for line_number, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                record = json.loads(line)
+                buyers.append({
+                    'buyer_id': str(record.get('buyer_id', f"line-{line_number}")),
+                    'preferences': record['preferences']
+                })
+        return buyers
+
+    def _read_checkpoint(self, output_dir):
+        """
+        Read the checkpoint, ignoring a line torn by a crash
+
+        Args:
+            output_dir (str): Output directory containing the checkpoint
+
+        Returns:
+            tuple: (set of completed buyer ids, set of checkpointed part file names)
+        """
+        completed = set()
+        parts = set()
+        checkpoint_path = os.path.join(output_dir, self.CHECKPOINT_FILE)
+        if not os.path.exists(checkpoint_path):
+            return completed, parts
+
+        with open(checkpoint_path, 'r') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if 'part' in record:
+                    parts.add(record['part'])
+                completed.update(record.get('buyer_ids', []))
+                if 'buyer_id' in record:
+                    completed.add(record['buyer_id'])
+        return completed, parts
+
+    def _part_files(self, output_dir):
+        return sorted(
+            name for name in os.listdir(output_dir)
+            if name.startswith(self.PART_PREFIX) and not name.endswith(".tmp")
+        )
+
+    def _read_part_buyer_ids(self, path):
+        if path.endswith(".parquet"):
+            df = pd.read_parquet(path, columns=['buyer_id'])
+        else:
+            df = pd.read_json(path, orient='records', lines=True, dtype={'buyer_id': str})
+        return [str(buyer_id) for buyer_id in df['buyer_id'].unique()] if len(df) else []
+
+    def recover_parts(self, output_dir):
+        """
+        Checkpoint part files written by an earlier run that stopped before checkpointing them,
+        and remove incomplete temporary files
+
+        Args:
+            output_dir (str): Output directory
+
+        Returns:
+            int: Number of recovered part files
+        """
+        for name in os.listdir(output_dir):
+            if name.startswith(self.PART_PREFIX) and name.endswith(".tmp"):
+                os.remove(os.path.join(output_dir, name))
+
+        _, checkpointed_parts = self._read_checkpoint(output_dir)
+        recovered = 0
+        for name in self._part_files(output_dir):
+            if name not in checkpointed_parts:
+                buyer_ids = self._read_part_buyer_ids(os.path.join(output_dir, name))
+                self._checkpoint(buyer_ids, output_dir, name)
+                recovered += 1
+        return recovered
+
+    def load_completed(self, output_dir):
+        """
+        Load the ids of buyers completed in previous runs
+
+        Args:
+            output_dir (str): Output directory containing the checkpoint
+
+        Returns:
+            set: Completed buyer ids
+        """
+        completed, _ = self._read_checkpoint(output_dir)
+        return completed
+
+    def process_buyer(self, buyer):
+        """
+        Search and personalize listings for a single buyer
+
+        Args:
+            buyer (dict): Buyer dictionary with 'buyer_id' and 'preferences'
+
+        Returns:
+            list: ScoredListing results for the buyer, best first
+        """
+        preferences = buyer['preferences']
+        constraints = self.constraint_extractor.extract_all(preferences) if self.constraint_extractor else None
+        matches = self.vector_db.search(" ".join(preferences), self.num_results, constraints=constraints)
+
+        if self.personalize:
+            matches = self.listing_personalizer.personalize_listings(matches, preferences, verbose=False)
+        return matches
+
+    def _to_columns(self, results):
+        """
+        Convert buyers' results into output columns, reading the shared listings directly
+        instead of building a dictionary per result
+
+        Args:
+            results (list): (buyer id, list of ScoredListing results) pairs
+
+        Returns:
+            dict: Column name to list of values, one entry per result
+        """
+        columns = {name: [] for name in ('buyer_id', 'rank') + LISTING_FIELDS + ('listing_id', 'similarity_score')}
+        if self.personalize:
+            columns['personalized_description'] = []
+
+        for buyer_id, matches in results:
+            for rank, result in enumerate(matches, 1):
+                listing = result.listing
+                columns['buyer_id'].append(buyer_id)
+                columns['rank'].append(rank)
+                for field in LISTING_FIELDS:
+                    columns[field].append(getattr(listing, field))
+                columns['listing_id'].append(listing.listing_id)
+                columns['similarity_score'].append(result.similarity_score)
+                if self.personalize:
+                    columns['personalized_description'].append(result.personalized_description)
+        return columns
+
+    def _write_part(self, results, output_dir, part_number):
+        """
+        Write one chunk of results to a new part file and sync it to disk
+
+        Args:
+            results (list): (buyer id, list of ScoredListing results) pairs
+            output_dir (str): Output directory
+            part_number (int): Sequence number of the part file
+
+        Returns:
+            str: Name of the part file, or None if there were no results
+        """
+        if not any(matches for _, matches in results):
+            return None
+
+        extension = "parquet" if self.output_format == "parquet" else "jsonl"
+        name = f"{self.PART_PREFIX}{part_number:05d}.{extension}"
+        path = os.path.join(output_dir, name)
+        tmp_path = path + ".tmp"
+
+        df = pd.DataFrame(self._to_columns(results))
+        if self.output_format == "parquet":
+            df.to_parquet(tmp_path, index=False)
+        else:
+            df.to_json(tmp_path, orient='records', lines=True)
+
+        with open(tmp_path, 'rb') as f:
+            os.fsync(f.fileno())
+
+        # Only expose complete files, and make the rename durable before checkpointing
+        os.replace(tmp_path, path)
+        directory_fd = os.open(output_dir, os.O_RDONLY)
+        try:
+            os.fsync(directory_fd)
+        finally:
+            os.close(directory_fd)
+        return name
+
+    def _checkpoint(self, buyer_ids, output_dir, part_name=None):
+        """
+        Record buyers whose results have been written, as one line per part file
+
+        Args:
+            buyer_ids (list): Completed buyer ids
+            output_dir (str): Output directory
+            part_name (str, optional): Part file holding their results
+        """
+        record = {'buyer_ids': list(buyer_ids)}
+        if part_name:
+            record['part'] = part_name
+
+        checkpoint_path = os.path.join(output_dir, self.CHECKPOINT_FILE)
+        with open(checkpoint_path, 'ab+') as f:
+            # Start a new line after a line torn by a crash, so this record is not lost with it
+            torn = False
+            if f.tell():
+                f.seek(-1, os.SEEK_END)
+                torn = f.read(1) != b"\n"
+            f.write((("\n" if torn else "") + json.dumps(record) + "\n").encode())
+            f.flush()
+            os.fsync(f.fileno())
+
+    def run(self, input_file, output_dir):
+        """
+        Process all buyers in the input file, skipping buyers completed in earlier runs
+
+        Args:
+            input_file (str): Path to the JSONL file with buyer preferences
+            output_dir (str): Directory for result part files and the checkpoint
+
+        Returns:
+            dict: Summary with counts, elapsed time and throughput in buyers per second
+        """
+        os.makedirs(output_dir, exist_ok=True)
+
+        buyers = self.load_buyers(input_file)
+        recovered = self.recover_parts(output_dir)
+        if recovered:
+            print(f"Recovered {recovered} part files written after the last checkpoint")
+        completed = self.load_completed(output_dir)
+        pending = [buyer for buyer in buyers if buyer['buyer_id'] not in completed]
+        print(f"Batch: {len(buyers)} buyers, {len(buyers) - len(pending)} already completed, {len(pending)} to process")
+
+        # Continue numbering after part files from earlier runs
+        part_numbers = [int(name[len(self.PART_PREFIX):].split(".")[0]) for name in self._part_files(output_dir)]
+        part_number = max(part_numbers) + 1 if part_numbers else 0
+
+        results_buffer = []
+        ids_buffer = []
+        processed = 0
+        failed = 0
+        start_time = time.perf_counter()
+
+        def flush():
+            nonlocal results_buffer, ids_buffer, part_number
+            if not ids_buffer:
+                return
+            part_name = self._write_part(results_buffer, output_dir, part_number)
+            self._checkpoint(ids_buffer, output_dir, part_name)
+            part_number += 1
+            results_buffer = []
+            ids_buffer = []
+            elapsed = max(time.perf_counter() - start_time, 1e-9)
+            print(f"Processed {processed}/{len(pending)} buyers ({processed / elapsed:.2f} buyers/sec)")
+
+        buyer_iter = iter(pending)
+        in_flight = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            # Keep at most two buyers per worker queued so memory stays bounded
+            def submit_next():
+                buyer = next(buyer_iter, None)
+                if buyer is None:
+                    return False
+                in_flight[executor.submit(self.process_buyer, buyer)] = buyer
+                return True
+
+            for _ in range(self.max_workers * 2):
+                if not submit_next():
+                    break
+
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    buyer = in_flight.pop(future)
+                    try:
+                        results_buffer.append((buyer['buyer_id'], future.result()))
+                        ids_buffer.append(buyer['buyer_id'])
+                        processed += 1
+                    except Exception as e:
+                        failed += 1
+                        print(f"Error processing buyer {buyer['buyer_id']}: {e}")
+                    submit_next()
+
+                if len(ids_buffer) >= self.flush_every:
+                    flush()
+
+            flush()
+
+        elapsed = time.perf_counter() - start_time
+        summary = {
+            'total_buyers': len(buyers),
+            'skipped': len(buyers) - len(pending),
+            'processed': processed,
+            'failed': failed,
+            'elapsed_seconds': round(elapsed, 3),
+            'buyers_per_second': round(processed / elapsed, 3) if elapsed > 0 else 0.0
+        }
+        print(f"Batch complete: {processed} processed, {failed} failed, "
+              f"{summary['buyers_per_second']:.2f} buyers/sec")
+        return summary
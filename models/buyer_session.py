@@ -0,0 +1,235 @@
+# Buyer Session Module
+# Responsible for refining a buyer's search incrementally as they edit their answers
+
+import time
+
+import numpy as np
+
+from models.constraint_extractor import (
+    ConstraintExtractor, merge_constraints, satisfies_constraints, constraints_to_filter
+)
+from models.ivf_index import normalize
+
+class BuyerSession:
+    """
+    Class for keeping a buyer's per-answer embeddings and candidate listings between searches.
+
+    The query embedding is the normalized mean of the per-answer embeddings, so editing one
+    answer only requires embedding that answer. Candidates are fetched like
+    VectorDBManager.search: listings meeting the numeric constraints first, topped up with
+    unfiltered listings when too few of them exist. Refinements re-score the cached
+    candidates and fall back to a full search when the numeric constraints change, or when a
+    pool the results come from is exhausted: the query has moved further than the radius R
+    of that pool around the query it was fetched for.
+
+    With exact=True the cache is only used when it provably holds the true top results: by
+    the triangle inequality, a listing outside a pool is at least R - delta away from the
+    new query, where delta is how far the query has moved.
+    """
+
+    def __init__(self, vector_db, preferences, num_results=3, overfetch=10, constraint_extractor=None,
+                 exact=False):
+        """
+        Initialize the BuyerSession.
+
+        Args:
+            vector_db (VectorDBManager): Vector database to search
+            preferences (list): The buyer's preference answers
+            num_results (int): Number of results to return
+            overfetch (int): Candidates cached per requested result
+            constraint_extractor (ConstraintExtractor, optional): Extractor for structured constraints
+            exact (bool): Whether refinements must match a full search exactly
+        """
+        self.vector_db = vector_db
+        self.preferences = list(preferences)
+        self.num_results = num_results
+        self.overfetch = overfetch
+        self.exact = exact
+        self.constraint_extractor = constraint_extractor or ConstraintExtractor()
+
+        self.answer_embeddings = None
+        self.answer_constraints = [self.constraint_extractor.extract(answer) for answer in self.preferences]
+        self.query_embedding = None
+
+        self.candidate_ids = []
+        self.candidate_metadatas = []
+        self.candidate_embeddings = None
+        self.candidate_filter = None
+        self.anchor_embedding = None
+        # Radius and completeness of the pool of listings meeting the constraints, and of the
+        # unfiltered pool (radius None if it was not fetched)
+        self.matching_radius = 0.0
+        self.matching_exhaustive = False
+        self.unfiltered_radius = None
+        self.unfiltered_exhaustive = False
+
+        self.last_search_seconds = 0.0
+        self.stats = {'full_searches': 0, 'cached_refinements': 0, 'fallbacks': 0}
+
+    @property
+    def constraints(self):
+        return merge_constraints(self.answer_constraints)
+
+    def _update_query_embedding(self):
+        self.query_embedding = normalize(self.answer_embeddings.mean(axis=0))
+
+    def _fetch_pool(self, num_candidates, constraints=None):
+        doc_ids, metadatas, embeddings = self.vector_db.search_candidates(
+            self.query_embedding, num_candidates, constraints=constraints
+        )
+        radius = float(np.linalg.norm(embeddings - self.query_embedding, axis=1).max()) if len(doc_ids) else 0.0
+        # Fewer candidates than requested means every listing in the pool is cached
+        return doc_ids, metadatas, embeddings, radius, len(doc_ids) < num_candidates
+
+    def _fetch_candidates(self):
+        """
+        Run a full search around the current query and cache the candidates
+        """
+        num_candidates = self.num_results * self.overfetch
+        constraints = self.constraints
+        where = constraints_to_filter(constraints)
+
+        doc_ids, metadatas, embeddings, radius, exhaustive = self._fetch_pool(num_candidates, constraints)
+        self.matching_radius = radius
+        self.matching_exhaustive = exhaustive
+        self.unfiltered_radius = None
+        self.unfiltered_exhaustive = False
+
+        if where is None:
+            self.unfiltered_radius = radius
+            self.unfiltered_exhaustive = exhaustive
+        elif len(doc_ids) < self.num_results:
+            # Too few listings meet the constraints; top up with the nearest others
+            cached = set(doc_ids)
+            extra_ids, extra_metadatas, extra_embeddings, radius, exhaustive = self._fetch_pool(num_candidates)
+            keep = [i for i, doc_id in enumerate(extra_ids) if doc_id not in cached]
+            doc_ids = list(doc_ids) + [extra_ids[i] for i in keep]
+            metadatas = list(metadatas) + [extra_metadatas[i] for i in keep]
+            embeddings = np.concatenate([embeddings.reshape(-1, extra_embeddings.shape[1]), extra_embeddings[keep]])
+            self.unfiltered_radius = radius
+            self.unfiltered_exhaustive = exhaustive
+
+        self.candidate_ids = doc_ids
+        self.candidate_metadatas = metadatas
+        self.candidate_embeddings = embeddings
+        self.candidate_filter = where
+        self.anchor_embedding = self.query_embedding
+        self.stats['full_searches'] += 1
+
+    def _pool_covers(self, radius, exhaustive, similarities, drift, max_boost):
+        """
+        Check whether no listing outside a cached pool can outrank the selected ones from it
+        """
+        if exhaustive or not similarities:
+            return True
+        if radius is None or drift >= radius:
+            return False
+        if not self.exact:
+            return True
+
+        # Uncached listings are at least (radius - drift) away; amenity boosts can close part of that gap
+        bound = (radius - drift) ** 2 - max_boost
+        return max(1 - similarity for similarity in similarities) <= bound
+
+    def _rank_candidates(self):
+        """
+        Score the cached candidates against the current query
+
+        Returns:
+            tuple: (ranked (document id, metadata, similarity) triples, whether the cached candidates suffice)
+        """
+        distances = np.linalg.norm(self.candidate_embeddings - self.query_embedding, axis=1)
+        # Same convention as VectorDBManager.search: 1 - squared L2 distance
+        candidates = [
+            (doc_id, metadata, float(1 - distance ** 2))
+            for doc_id, metadata, distance in zip(self.candidate_ids, self.candidate_metadatas, distances)
+        ]
+
+        constraints = self.constraints
+        if constraints:
+            ranked = self.vector_db.rank_with_constraints(candidates, constraints)
+        else:
+            ranked = sorted(candidates, key=lambda item: item[2], reverse=True)
+        selected = ranked[:self.num_results]
+
+        # The cached pools were fetched for other numeric constraints
+        if constraints_to_filter(constraints) != self.candidate_filter:
+            return ranked, False
+        if len(selected) < self.num_results:
+            return ranked, self.unfiltered_radius is not None and self.unfiltered_exhaustive
+
+        matching = [similarity for _, metadata, similarity in selected if satisfies_constraints(metadata, constraints)]
+        others = [similarity for _, metadata, similarity in selected if not satisfies_constraints(metadata, constraints)]
+        # Listings not meeting the constraints are only selected when every matching listing is cached
+        if others and not self.matching_exhaustive:
+            return ranked, False
+
+        drift = float(np.linalg.norm(self.query_embedding - self.anchor_embedding))
+        max_boost = self.vector_db.AMENITY_BOOST * len(constraints.get('amenities', []))
+        complete = (
+            self._pool_covers(self.matching_radius, self.matching_exhaustive, matching, drift, max_boost)
+            and self._pool_covers(self.unfiltered_radius, self.unfiltered_exhaustive, others, drift, max_boost)
+        )
+        return ranked, complete
+
+    def _results(self, ranked):
+        return [
+            self.vector_db.listing_from_metadata(doc_id, metadata, similarity)
+            for doc_id, metadata, similarity in ranked[:self.num_results]
+        ]
+
+    def search(self):
+        """
+        Run a cold search, embedding every answer in one request
+
+        Returns:
+            list: List of ScoredListing results
+        """
+        start_time = time.perf_counter()
+
+        embeddings = self.vector_db.embeddings.embed_documents(self.preferences)
+        self.answer_embeddings = normalize(embeddings)
+        self._update_query_embedding()
+        self._fetch_candidates()
+        ranked, _ = self._rank_candidates()
+
+        self.last_search_seconds = time.perf_counter() - start_time
+        return self._results(ranked)
+
+    def refine(self, answer_index, new_answer):
+        """
+        Replace one answer and update the results, re-embedding only that answer
+
+        Args:
+            answer_index (int): Index of the answer to replace
+            new_answer (str): The new answer
+
+        Returns:
+            list: List of ScoredListing results
+        """
+        if not 0 <= answer_index < len(self.preferences):
+            raise ValueError(f"Answer index {answer_index} is out of range.")
+        if self.answer_embeddings is None:
+            self.preferences[answer_index] = new_answer
+            self.answer_constraints[answer_index] = self.constraint_extractor.extract(new_answer)
+            return self.search()
+
+        start_time = time.perf_counter()
+
+        if new_answer != self.preferences[answer_index]:
+            self.preferences[answer_index] = new_answer
+            self.answer_constraints[answer_index] = self.constraint_extractor.extract(new_answer)
+            self.answer_embeddings[answer_index] = normalize(self.vector_db.embeddings.embed_query(new_answer))
+            self._update_query_embedding()
+
+        ranked, complete = self._rank_candidates()
+        if complete:
+            self.stats['cached_refinements'] += 1
+        else:
+            # The cached candidates cannot guarantee the top results; search the full index again
+            self.stats['fallbacks'] += 1
+            self._fetch_candidates()
+            ranked, _ = self._rank_candidates()
+
+        self.last_search_seconds = time.perf_counter() - start_time
+        return self._results(ranked)
@@ -0,0 +1,370 @@
+# Constraint Extractor Module
+# Responsible for turning free-text buyer preferences into structured listing constraints
+
+import re
+from utils.helpers import parse_numeric
+
+# Spelled-out numbers buyers commonly use for room counts
+NUMBER_WORDS = {
+    'one': 1, 'single': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5,
+    'six': 6, 'seven': 7, 'eight': 8, 'nine': 9, 'ten': 10
+}
+
+# Canonical amenity names and the phrases that indicate them
+AMENITY_LEXICON = {
+    'garage': ['garage', 'carport'],
+    'backyard': ['backyard', 'back yard', 'yard'],
+    'garden': ['garden', 'gardening'],
+    'pool': ['pool', 'swimming pool'],
+    'fireplace': ['fireplace'],
+    'gym': ['gym', 'fitness center', 'fitness centre'],
+    'rooftop': ['rooftop', 'roof deck', 'rooftop terrace'],
+    'concierge': ['concierge'],
+    'patio': ['patio', 'deck'],
+    'balcony': ['balcony'],
+    'basement': ['basement'],
+    'home office': ['home office', 'study'],
+    'walk-in closet': ['walk-in closet'],
+    'energy efficient': ['energy efficient', 'energy-efficient', 'solar'],
+    'hardwood floors': ['hardwood'],
+    'air conditioning': ['air conditioning', 'central air'],
+    'security': ['security', 'gated'],
+    'parking': ['parking'],
+    'laundry': ['laundry', 'washer'],
+}
+
+# Words that negate the amenities mentioned right after them ("no pool", "without a garage")
+NEGATION_WORDS = {'no', 'not', 'without', 'never', 'avoid', 'except', 'nor', "don't", 'dont', "doesn't", "won't"}
+
+# Words that end the scope of a negation ("no pool but a garden")
+NEGATION_BREAKS = {'but', 'and', 'with', 'plus', 'though', 'however'}
+
+# Smallest step between room counts, used to turn strict bounds into inclusive ones
+ROOM_STEPS = {'bedrooms': 1, 'bathrooms': 0.5}
+
+# Listing fields checked by each numeric constraint
+CONSTRAINT_FIELDS = {
+    'price': 'price',
+    'bedrooms': 'bedrooms',
+    'bathrooms': 'bathrooms',
+    'size': 'house_size',
+}
+
+_NUMBER = r"\b(\d+(?:\.\d+)?|" + "|".join(NUMBER_WORDS) + r")"
+_AMOUNT = r"(\$?\s*\d[\d,]*(?:\.\d+)?(?:\s*(?:k|mm|m|million|thousand)\b)?)"
+_STRICT_MAX_WORDS = r"(?:under|below|less than|fewer than)"
+_INCLUSIVE_MAX_WORDS = r"(?:up to|no more than|at most|max(?:imum)?(?: of)?|within|budget(?: of| is)?)"
+_STRICT_MIN_WORDS = r"(?:over|above|(?<!no )more than)"
+_INCLUSIVE_MIN_WORDS = r"(?:at least|min(?:imum)?(?: of)?|from|starting at)"
+_MAX_WORDS = rf"(?:{_STRICT_MAX_WORDS}|{_INCLUSIVE_MAX_WORDS})"
+_MIN_WORDS = rf"(?:{_STRICT_MIN_WORDS}|{_INCLUSIVE_MIN_WORDS})"
+_SIZE_UNIT = r"(?:sq\.?\s*ft\.?|sqft|square\s+feet|square\s+foot|sf)\b"
+
+# Patterns are anchored on the number; qualifiers are looked up in the text just before it
+_BEDROOM_UNIT = r"(?:bed(?:room)?s?|br|bd)\b"
+_BATHROOM_UNIT = r"(?:bath(?:room)?s?|ba)\b"
+BEDROOM_PATTERN = re.compile(rf"{_NUMBER}\s*\+?[\s-]*{_BEDROOM_UNIT}", re.IGNORECASE)
+BATHROOM_PATTERN = re.compile(rf"{_NUMBER}\s*\+?[\s-]*{_BATHROOM_UNIT}", re.IGNORECASE)
+SIZE_RANGE_PATTERN = re.compile(rf"(\d[\d,]*)\s*(?:-|to|and)\s*(\d[\d,]*)\s*{_SIZE_UNIT}", re.IGNORECASE)
+SIZE_PATTERN = re.compile(rf"(\d[\d,]*)\s*{_SIZE_UNIT}", re.IGNORECASE)
+PRICE_RANGE_PATTERN = re.compile(rf"between\s+{_AMOUNT}\s+and\s+{_AMOUNT}|{_AMOUNT}\s*(?:-|to)\s*{_AMOUNT}", re.IGNORECASE)
+MAX_PRICE_PATTERN = re.compile(rf"{_MAX_WORDS}\s+{_AMOUNT}", re.IGNORECASE)
+MIN_PRICE_PATTERN = re.compile(rf"{_MIN_WORDS}\s+{_AMOUNT}", re.IGNORECASE)
+# The lower end must not be the tail of a larger amount ("$750,000 and 3 bedrooms")
+RANGE_START_PATTERN = re.compile(rf"(?<![\d,.$]){_NUMBER}\s*(?:-|to|or|and)\s*$", re.IGNORECASE)
+QUALIFIER_PATTERN = re.compile(
+    rf"(?:(?P<strict_max>{_STRICT_MAX_WORDS})|(?P<max>{_INCLUSIVE_MAX_WORDS})"
+    rf"|(?P<strict_min>{_STRICT_MIN_WORDS})|(?P<min>{_INCLUSIVE_MIN_WORDS}))\s*$",
+    re.IGNORECASE
+)
+WORD_PATTERN = re.compile(r"[a-z]+")
+TOKEN_PATTERN = re.compile(r"[a-z]+(?:'[a-z]+)?|[.,;:!?]")
+DIGIT_PATTERN = re.compile(r"\d")
+
+# Amenity phrases keyed by their lowercase words, matched on word n-grams
+_AMENITY_BY_PHRASE = {
+    tuple(WORD_PATTERN.findall(phrase)): amenity
+    for amenity, phrases in AMENITY_LEXICON.items()
+    for phrase in phrases
+}
+_MAX_PHRASE_WORDS = max(len(phrase) for phrase in _AMENITY_BY_PHRASE)
+_PHRASE_FIRST_WORDS = {phrase[0] for phrase in _AMENITY_BY_PHRASE}
+
+# Characters of context searched for a qualifier such as "at most"
+_QUALIFIER_WINDOW = 16
+
+# Words after a negation word that it applies to
+_NEGATION_WINDOW = 4
+
+
+def _to_number(token):
+    token = token.lower()
+    return float(NUMBER_WORDS[token]) if token in NUMBER_WORDS else float(token)
+
+
+def _is_price(amount):
+    """
+    Only treat an amount as a price when it is marked as money or large enough to be one
+    """
+    value = parse_numeric(amount)
+    if value is None:
+        return None
+    if "$" in amount or value >= 10000 or amount.rstrip()[-1:].isalpha():
+        return value
+    return None
+
+
+def _qualifier(text, position):
+    """
+    Find the qualifier right before a number: "strict_max", "max", "strict_min", "min" or None
+    """
+    match = QUALIFIER_PATTERN.search(text, max(0, position - _QUALIFIER_WINDOW), position)
+    return match.lastgroup if match else None
+
+
+def _range_start(text, position):
+    """
+    Find the lower end of a range ending at a number ("3 to" in "3 to 4 bedrooms")
+    """
+    match = RANGE_START_PATTERN.search(text, max(0, position - _QUALIFIER_WINDOW), position)
+    return _to_number(match.group(1)) if match else None
+
+
+def _has_max_qualifier(text, position):
+    return _qualifier(text, position) in ('strict_max', 'max')
+
+
+def _set_min(constraints, key, value):
+    current = constraints.get(key)
+    constraints[key] = value if current is None else max(current, value)
+
+
+def _set_max(constraints, key, value):
+    current = constraints.get(key)
+    constraints[key] = value if current is None else min(current, value)
+
+
+def merge_constraints(constraint_sets):
+    """
+    Merge constraints from several answers, keeping the tightest bounds
+
+    Args:
+        constraint_sets (list): List of constraint dictionaries
+
+    Returns:
+        dict: Merged constraints
+    """
+    merged = {}
+    amenities = set()
+    for constraints in constraint_sets:
+        for key, value in constraints.items():
+            if key == 'amenities':
+                amenities.update(value)
+            elif key.startswith('min_'):
+                _set_min(merged, key, value)
+            else:
+                _set_max(merged, key, value)
+    if amenities:
+        merged['amenities'] = sorted(amenities)
+    return merged
+
+
+def find_amenities(text):
+    """
+    Find the canonical amenities mentioned in a text
+
+    Amenities in the few words after a negation ("no pool", "without a garage") are
+    not counted; punctuation and words such as "but" end the negation.
+
+    Args:
+        text (str): Free text, e.g. a preference answer or a listing description
+
+    Returns:
+        set: Canonical amenity names
+    """
+    words = TOKEN_PATTERN.findall((text or "").lower())
+    amenities = set()
+    negated_until = -1
+    for i, word in enumerate(words):
+        if word in NEGATION_WORDS:
+            negated_until = i + _NEGATION_WINDOW
+            continue
+        if word in NEGATION_BREAKS or not word[0].isalpha():
+            negated_until = -1
+            continue
+        if word not in _PHRASE_FIRST_WORDS or i <= negated_until:
+            continue
+        for n in range(1, _MAX_PHRASE_WORDS + 1):
+            amenity = _AMENITY_BY_PHRASE.get(tuple(words[i:i + n]))
+            if amenity:
+                amenities.add(amenity)
+    return amenities
+
+
+def satisfies_constraints(listing, constraints):
+    """
+    Check whether a listing meets all numeric constraints
+
+    Listings with a missing or unparseable value do not satisfy a constraint on it.
+
+    Args:
+        listing (dict): Listing dictionary or document metadata
+        constraints (dict): Constraints from ConstraintExtractor
+
+    Returns:
+        bool: True if every numeric constraint is met
+    """
+    for name, field in CONSTRAINT_FIELDS.items():
+        low = constraints.get(f"min_{name}")
+        high = constraints.get(f"max_{name}")
+        if low is None and high is None:
+            continue
+        value = parse_numeric(listing.get(field))
+        if value is None or (low is not None and value < low) or (high is not None and value > high):
+            return False
+    return True
+
+
+def constraints_to_filter(constraints):
+    """
+    Convert numeric constraints into a Chroma metadata filter on the *_value fields
+
+    Args:
+        constraints (dict): Constraints from ConstraintExtractor
+
+    Returns:
+        dict: Chroma "where" filter, or None if there are no numeric constraints
+    """
+    conditions = []
+    for name, field in CONSTRAINT_FIELDS.items():
+        if constraints.get(f"min_{name}") is not None:
+            conditions.append({f"{field}_value": {"$gte": constraints[f"min_{name}"]}})
+        if constraints.get(f"max_{name}") is not None:
+            conditions.append({f"{field}_value": {"$lte": constraints[f"max_{name}"]}})
+
+    if not conditions:
+        return None
+    if len(conditions) == 1:
+        return conditions[0]
+    return {"$and": conditions}
+
+
+class ConstraintExtractor:
+    """
+    Class for extracting structured constraints from preference answers with precompiled rules.
+    """
+
+    def _extract_rooms(self, pattern, text, name, constraints):
+        step = ROOM_STEPS[name]
+        for match in pattern.finditer(text):
+            count = _to_number(match.group(1))
+            low = _range_start(text, match.start())
+            if low is not None and low <= count:
+                # "3 to 4 bedrooms", "2-3 bedrooms"; a larger number before it is not a range
+                # start but something else, such as a price in "750000 and 3 bedrooms"
+                _set_min(constraints, f"min_{name}", low)
+                _set_max(constraints, f"max_{name}", count)
+                continue
+
+            qualifier = _qualifier(text, match.start())
+            if qualifier == 'strict_max':
+                _set_max(constraints, f"max_{name}", count - step)
+            elif qualifier == 'max':
+                _set_max(constraints, f"max_{name}", count)
+            elif qualifier == 'strict_min':
+                _set_min(constraints, f"min_{name}", count + step)
+            else:
+                # A stated count ("three-bedroom", "at least 2 bedrooms") is treated as a minimum
+                _set_min(constraints, f"min_{name}", count)
+
+    def _extract_sizes(self, text, constraints):
+        spans = []
+        for match in SIZE_RANGE_PATTERN.finditer(text):
+            _set_min(constraints, 'min_size', parse_numeric(match.group(1)))
+            _set_max(constraints, 'max_size', parse_numeric(match.group(2)))
+            spans.append(match.span())
+
+        for match in SIZE_PATTERN.finditer(text):
+            if any(start <= match.start() < end for start, end in spans):
+                continue
+            size = parse_numeric(match.group(1))
+            if _has_max_qualifier(text, match.start()):
+                _set_max(constraints, 'max_size', size)
+            else:
+                _set_min(constraints, 'min_size', size)
+            spans.append(match.span())
+        return spans
+
+    def _extract_prices(self, text, constraints, size_spans):
+        spans = list(size_spans)
+
+        def is_free(match):
+            return not any(start <= match.start() < end for start, end in spans)
+
+        for match in PRICE_RANGE_PATTERN.finditer(text):
+            if not is_free(match):
+                continue
+            low_text, high_text = (match.group(1), match.group(2)) if match.group(1) else (match.group(3), match.group(4))
+            high = _is_price(high_text)
+            if high is None:
+                continue
+            # "$800-900k" shares the suffix of the upper bound
+            low = _is_price(low_text)
+            if low is None or low < high / 100:
+                low = _is_price(low_text.strip() + re.sub(r"^[\$\s\d,.]*", "", high_text))
+            if low is not None:
+                _set_min(constraints, 'min_price', low)
+            _set_max(constraints, 'max_price', high)
+            spans.append(match.span())
+
+        for pattern, setter, key in ((MAX_PRICE_PATTERN, _set_max, 'max_price'),
+                                     (MIN_PRICE_PATTERN, _set_min, 'min_price')):
+            for match in pattern.finditer(text):
+                if is_free(match):
+                    price = _is_price(match.group(1))
+                    if price is not None:
+                        setter(constraints, key, price)
+
+    def extract(self, text):
+        """
+        Extract constraints from a single preference answer
+
+        Args:
+            text (str): Preference answer
+
+        Returns:
+            dict: Constraints such as min_bedrooms, max_price, min_size and amenities
+        """
+        constraints = {}
+        lowered = text.lower()
+
+        # Cheap substring checks skip patterns that cannot match
+        if "b" in lowered:
+            if "bed" in lowered or "br" in lowered or "bd" in lowered:
+                self._extract_rooms(BEDROOM_PATTERN, text, 'bedrooms', constraints)
+            if "bath" in lowered or "ba" in lowered:
+                self._extract_rooms(BATHROOM_PATTERN, text, 'bathrooms', constraints)
+
+        if DIGIT_PATTERN.search(text):
+            size_spans = []
+            if "sq" in lowered or "sf" in lowered:
+                size_spans = self._extract_sizes(text, constraints)
+            self._extract_prices(text, constraints, size_spans)
+
+        amenities = find_amenities(lowered)
+        if amenities:
+            constraints['amenities'] = sorted(amenities)
+
+        return constraints
+
+    def extract_all(self, answers):
+        """
+        Extract and merge constraints from all preference answers
+
+        Args:
+            answers (list): List of preference answers
+
+        Returns:
+            dict: Merged constraints
+        """
+        return merge_constraints([self.extract(answer) for answer in answers])
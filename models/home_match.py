@@ -12,6 +12,8 @@ from models.listing_generator import ListingGenerator
 from models.vector_db import VectorDBManager
 from models.preference_manager import PreferenceManager
 from models.listing_personalizer import ListingPersonalizer
+from models.batch_runner import BatchRunner
+from models.buyer_session import BuyerSession
 from utils.helpers import setup_environment, create_directory_if_not_exists
 
 class HomeMatch:
@@ -19,9 +21,14 @@ class HomeMatch:
     Main HomeMatch application class that coordinates all components.
     """
     
-    def __init__(self):
+    def __init__(self, index_backend="chroma", nlist=None, nprobe=8):
         """
         Initialize the HomeMatch application.
+        
+        Args:
+            index_backend (str): Vector search backend, "chroma" or "ivf"
+            nlist (int, optional): Number of IVF lists
+            nprobe (int): Number of IVF lists scanned per query
         """
         # Check if environment is set up correctly
         if not setup_environment():
@@ -34,7 +41,12 @@ class HomeMatch:
         
         # Initialize components
         self.listing_generator = ListingGenerator()
-        self.vector_db = VectorDBManager(persist_directory=os.path.join(project_root, "data", "vectordb"))
+        self.vector_db = VectorDBManager(
+            persist_directory=os.path.join(project_root, "data", "vectordb"),
+            index_backend=index_backend,
+            nlist=nlist,
+            nprobe=nprobe
+        )
         self.preference_manager = PreferenceManager()
         self.listing_personalizer = ListingPersonalizer()
         
@@ -68,13 +80,27 @@ class HomeMatch:
         
         return listings
     
-    def setup_vector_db(self, listings):
+    def setup_vector_db(self, listings, rebuild=False):
         """
-        Set up the vector database with listings
+        Set up the vector database with listings, reusing an already populated database
+        
+        A database written by an earlier version, with a different document layout, is rebuilt.
         
         Args:
             listings (list): List of listings to store
+            rebuild (bool): Whether to replace the stored listings even if the database is populated
         """
+        if not rebuild and self.vector_db.count():
+            if not self.vector_db.has_current_layout():
+                print("Vector database uses an outdated layout. Rebuilding it...")
+                self.vector_db.initialize_with_listings(listings)
+                return
+            print(f"Reusing vector database with {self.vector_db.count()} listings")
+            # Build a missing IVF index now rather than inside concurrent searches
+            if self.vector_db.index_backend == "ivf":
+                self.vector_db.ensure_ivf_index()
+            return
+        
         self.vector_db.initialize_with_listings(listings)
     
     def collect_preferences(self, interactive=False):
@@ -102,18 +128,55 @@ class HomeMatch:
         
         return preferences, preference_query
     
-    def search_listings(self, preference_query, num_results=3):
+    def search_listings(self, preference_query, num_results=3, constraints=None):
         """
         Search for listings that match preferences
         
         Args:
             preference_query (str): Combined buyer preferences
             num_results (int): Number of results to return
+            constraints (dict, optional): Structured constraints extracted from the preferences
             
         Returns:
             list: List of matching listings
         """
-        return self.vector_db.search(preference_query, num_results)
+        return self.vector_db.search(preference_query, num_results, constraints=constraints)
+    
+    def similar_listings(self, listing_id, num_results=3):
+        """
+        Find listings similar to a given listing ("more like this")
+        
+        Args:
+            listing_id (int): Id of the listing (the 'listing_id' of a search result)
+            num_results (int): Number of similar listings to return (at most 10)
+            
+        Returns:
+            list: List of similar listings
+        """
+        return self.vector_db.similar_to(listing_id, num_results)
+    
+    def create_session(self, buyer_preferences=None, num_results=3, exact=False):
+        """
+        Create a buyer session whose search can be refined answer by answer
+        
+        Args:
+            buyer_preferences (list, optional): Preference answers (defaults to the default answers)
+            num_results (int): Number of results to return
+            exact (bool): Whether refinements must match a full search exactly
+            
+        Returns:
+            BuyerSession: Session ready for search() and refine()
+        """
+        if buyer_preferences is None:
+            buyer_preferences = self.preference_manager.default_answers
+        
+        return BuyerSession(
+            self.vector_db,
+            buyer_preferences,
+            num_results=num_results,
+            constraint_extractor=self.preference_manager.constraint_extractor,
+            exact=exact
+        )
     
     def personalize_listings(self, matching_listings, buyer_preferences):
         """
@@ -147,14 +210,17 @@ class HomeMatch:
         listings = self.generate_listings(num_listings, force_new_listings)
         
         # Step 2: Set up vector database
-        self.setup_vector_db(listings)
+        self.setup_vector_db(listings, rebuild=force_new_listings)
         
         # Step 3: Collect buyer preferences
         buyer_preferences, preference_query = self.collect_preferences(interactive)
         
-        # Step 4: Search for matching listings
+        # Step 4: Search for matching listings, using extracted constraints as filters and boosts
+        constraints = self.preference_manager.extract_constraints(buyer_preferences)
+        if constraints:
+            print(f"Extracted constraints: {constraints}")
         print("\nSearching for matching listings...")
-        matching_listings = self.search_listings(preference_query, num_results)
+        matching_listings = self.search_listings(preference_query, num_results, constraints)
         
         # Step 5: Personalize descriptions
         print("\nPersonalizing descriptions...")
@@ -164,3 +230,39 @@ class HomeMatch:
         self.listing_personalizer.display_personalized_listings(personalized_listings)
         
         return personalized_listings
+    
+    def run_batch(self, input_file, output_dir, num_listings=10, num_results=3, max_workers=8,
+                  personalize=True, output_format="parquet", flush_every=100, force_new_listings=False):
+        """
+        Run HomeMatch offline for many buyers read from a JSONL file
+        
+        Args:
+            input_file (str): JSONL file with one buyer preference set per line
+            output_dir (str): Directory for result files and the progress checkpoint
+            num_listings (int): Number of listings to generate
+            num_results (int): Number of results per buyer
+            max_workers (int): Number of buyers processed concurrently
+            personalize (bool): Whether to personalize descriptions
+            output_format (str): Output format, either "parquet" or "jsonl"
+            flush_every (int): Number of completed buyers per output file
+            force_new_listings (bool): Whether to force new listing generation
+            
+        Returns:
+            dict: Batch summary including throughput in buyers per second
+        """
+        print("=== RUNNING HOMEMATCH BATCH ===\n")
+        
+        # Prepare listings and vector database once for all buyers; reruns reuse the stored listings
+        listings = self.generate_listings(num_listings, force_new_listings)
+        self.setup_vector_db(listings, rebuild=force_new_listings)
+        
+        batch_runner = BatchRunner(
+            self.vector_db,
+            self.listing_personalizer,
+            num_results=num_results,
+            max_workers=max_workers,
+            personalize=personalize,
+            flush_every=flush_every,
+            output_format=output_format
+        )
+        return batch_runner.run(input_file, output_dir)
@@ -0,0 +1,311 @@
+# IVF Index Module
+# Responsible for approximate nearest-neighbor search with an inverted-file index
+
+import os
+import json
+
+import numpy as np
+
+def normalize(vectors):
+    """
+    Scale vectors to unit length so inner product equals cosine similarity
+
+    Args:
+        vectors (np.ndarray): Array of shape (n, d) or (d,)
+
+    Returns:
+        np.ndarray: Normalized float32 array
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+def top_k(scores, k):
+    """
+    Get the indices of the k highest scores, best first
+
+    Args:
+        scores (np.ndarray): 1-D array of scores
+        k (int): Number of indices to return
+
+    Returns:
+        np.ndarray: Indices sorted by descending score
+    """
+    k = min(k, len(scores))
+    if k == 0:
+        return np.empty(0, dtype=np.int64)
+    candidates = np.argpartition(-scores, k - 1)[:k]
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+def exact_search(vectors, ids, query, k):
+    """
+    Brute-force cosine search, used as ground truth for recall measurements
+
+    Args:
+        vectors (np.ndarray): Normalized vectors of shape (n, d)
+        ids (np.ndarray): Ids of the vectors
+        query (np.ndarray): Query vector
+        k (int): Number of results
+
+    Returns:
+        tuple: (ids, scores) of the k best matches
+    """
+    scores = vectors @ normalize(query)
+    best = top_k(scores, k)
+    return ids[best], scores[best]
+
+class IVFIndex:
+    """
+    Inverted-file index with a k-means coarse quantizer over cosine similarity.
+
+    Vectors are stored contiguously grouped by their nearest centroid, so a query
+    only scores the nprobe lists whose centroids are closest to it. Vectors added
+    after training go to a small pending area, assigned to their nearest centroid,
+    and are merged into the main arrays by compact() without retraining.
+    """
+
+    FILES = ("centroids", "vectors", "ids", "offsets")
+    PENDING_FILES = ("pending_vectors", "pending_ids", "pending_lists")
+
+    def __init__(self, nlist=None, nprobe=8, compact_ratio=0.1):
+        """
+        Initialize the IVFIndex.
+
+        Args:
+            nlist (int, optional): Number of lists (defaults to 4 * sqrt(n) at build time)
+            nprobe (int): Number of lists scanned per query (higher is slower but more accurate)
+            compact_ratio (float): Pending-to-main size ratio that triggers compact() on add
+        """
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.compact_ratio = compact_ratio
+        self.centroids = None
+        self.vectors = None
+        self.ids = None
+        self.offsets = None
+        self._reset_pending(0)
+        self._main_dirty = False
+
+    def __len__(self):
+        main = 0 if self.ids is None else len(self.ids)
+        return main + len(self.pending_ids)
+
+    @property
+    def is_trained(self):
+        return self.centroids is not None
+
+    def _reset_pending(self, dim):
+        self.pending_vectors = np.empty((0, dim), dtype=np.float32)
+        self.pending_ids = np.empty(0, dtype=np.int64)
+        self.pending_lists = np.empty(0, dtype=np.int64)
+
+    def assign(self, vectors, block_size=65536):
+        """
+        Find the nearest centroid of each vector
+
+        Args:
+            vectors (np.ndarray): Normalized vectors of shape (n, d)
+            block_size (int): Rows scored at once to bound memory use
+
+        Returns:
+            np.ndarray: List number of each vector
+        """
+        assignments = np.empty(len(vectors), dtype=np.int64)
+        for start in range(0, len(vectors), block_size):
+            block = vectors[start:start + block_size]
+            assignments[start:start + block_size] = np.argmax(block @ self.centroids.T, axis=1)
+        return assignments
+
+    def train(self, vectors, n_iter=20, sample_size=None, seed=0):
+        """
+        Train the coarse quantizer with spherical k-means
+
+        Args:
+            vectors (np.ndarray): Training vectors of shape (n, d)
+            n_iter (int): Number of k-means iterations
+            sample_size (int, optional): Number of vectors sampled for training (defaults to 256 per list)
+            seed (int): Random seed
+        """
+        vectors = normalize(vectors)
+        n = len(vectors)
+        if n == 0:
+            raise ValueError("Cannot train an IVF index without vectors.")
+
+        if self.nlist is None:
+            self.nlist = int(4 * np.sqrt(n))
+        self.nlist = max(1, min(self.nlist, n))
+
+        rng = np.random.default_rng(seed)
+        sample_size = min(n, sample_size or self.nlist * 256)
+        sample = vectors[rng.choice(n, sample_size, replace=False)] if sample_size < n else vectors
+
+        self.centroids = sample[rng.choice(len(sample), self.nlist, replace=False)].copy()
+        for _ in range(n_iter):
+            assignments = self.assign(sample)
+            sums = np.zeros_like(self.centroids)
+            np.add.at(sums, assignments, sample)
+            counts = np.bincount(assignments, minlength=self.nlist)
+
+            # Re-seed empty lists with random sample points
+            empty = np.flatnonzero(counts == 0)
+            if len(empty):
+                sums[empty] = sample[rng.choice(len(sample), len(empty), replace=False)]
+            self.centroids = normalize(sums)
+
+    def build(self, vectors, ids, **train_kwargs):
+        """
+        Train the index and add all vectors to it
+
+        Args:
+            vectors (np.ndarray): Vectors of shape (n, d)
+            ids (np.ndarray): Integer id of each vector
+            **train_kwargs: Arguments for train()
+        """
+        vectors = normalize(vectors)
+        self.train(vectors, **train_kwargs)
+
+        assignments = self.assign(vectors)
+        order = np.argsort(assignments, kind="stable")
+        self.vectors = np.ascontiguousarray(vectors[order])
+        self.ids = np.asarray(ids, dtype=np.int64)[order]
+        self.offsets = np.zeros(self.nlist + 1, dtype=np.int64)
+        np.cumsum(np.bincount(assignments, minlength=self.nlist), out=self.offsets[1:])
+        self._reset_pending(vectors.shape[1])
+        self._main_dirty = True
+
+    def add(self, vectors, ids):
+        """
+        Add vectors to their nearest lists without retraining
+
+        Args:
+            vectors (np.ndarray): Vectors of shape (m, d)
+            ids (np.ndarray): Integer id of each vector
+        """
+        if not self.is_trained:
+            raise ValueError("IVF index is not trained. Call build first.")
+
+        vectors = normalize(vectors).reshape(-1, self.centroids.shape[1])
+        self.pending_vectors = np.concatenate([self.pending_vectors, vectors])
+        self.pending_ids = np.concatenate([self.pending_ids, np.asarray(ids, dtype=np.int64)])
+        self.pending_lists = np.concatenate([self.pending_lists, self.assign(vectors)])
+
+        if len(self.pending_ids) > self.compact_ratio * len(self.ids):
+            self.compact()
+
+    def compact(self):
+        """
+        Merge pending vectors into the main list-ordered arrays
+        """
+        if len(self.pending_ids) == 0:
+            return
+
+        main_lists = np.repeat(np.arange(self.nlist), np.diff(self.offsets))
+        lists = np.concatenate([main_lists, self.pending_lists])
+        order = np.argsort(lists, kind="stable")
+
+        self.vectors = np.ascontiguousarray(np.concatenate([self.vectors, self.pending_vectors])[order])
+        self.ids = np.concatenate([self.ids, self.pending_ids])[order]
+        np.cumsum(np.bincount(lists, minlength=self.nlist), out=self.offsets[1:])
+        self._reset_pending(self.centroids.shape[1])
+        self._main_dirty = True
+
+    def search(self, query, k=3, nprobe=None, allowed=None):
+        """
+        Find the approximate k nearest vectors to a query
+
+        Args:
+            query (np.ndarray): Query vector
+            k (int): Number of results
+            nprobe (int, optional): Lists to scan (defaults to self.nprobe)
+            allowed (np.ndarray, optional): Boolean mask indexed by id; only ids marked True are
+                scored, so filtered results come from the whole of the probed lists
+
+        Returns:
+            tuple: (ids, scores) of the best matches, with cosine similarity scores
+        """
+        if not self.is_trained:
+            raise ValueError("IVF index is not trained. Call build first.")
+
+        query = normalize(query)
+        nprobe = min(nprobe or self.nprobe, self.nlist)
+        probe = top_k(self.centroids @ query, nprobe)
+
+        score_parts = []
+        id_parts = []
+        for list_no in probe:
+            start, end = self.offsets[list_no], self.offsets[list_no + 1]
+            if end > start:
+                vectors = self.vectors[start:end]
+                ids = self.ids[start:end]
+                if allowed is not None:
+                    keep = allowed[ids]
+                    vectors = vectors[keep]
+                    ids = ids[keep]
+                score_parts.append(vectors @ query)
+                id_parts.append(ids)
+
+        if len(self.pending_ids):
+            mask = np.isin(self.pending_lists, probe)
+            if allowed is not None:
+                mask &= allowed[self.pending_ids]
+            score_parts.append(self.pending_vectors[mask] @ query)
+            id_parts.append(self.pending_ids[mask])
+
+        if not score_parts:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        scores = np.concatenate(score_parts)
+        ids = np.concatenate(id_parts)
+        best = top_k(scores, k)
+        return ids[best], scores[best]
+
+    def save(self, directory):
+        """
+        Persist the index as .npy files that can be memory-mapped by load()
+
+        Args:
+            directory (str): Directory to write the index to
+        """
+        os.makedirs(directory, exist_ok=True)
+
+        arrays = {name: getattr(self, name) for name in self.PENDING_FILES}
+        if self._main_dirty or not os.path.exists(os.path.join(directory, "vectors.npy")):
+            arrays.update({name: getattr(self, name) for name in self.FILES})
+
+        # Write to temporary files first so readers never see a partial index
+        for name, array in arrays.items():
+            tmp_path = os.path.join(directory, f"{name}.tmp.npy")
+            np.save(tmp_path, np.asarray(array))
+            os.replace(tmp_path, os.path.join(directory, f"{name}.npy"))
+
+        with open(os.path.join(directory, "meta.json"), 'w') as f:
+            json.dump({'nlist': self.nlist, 'nprobe': self.nprobe, 'compact_ratio': self.compact_ratio}, f)
+
+        self._main_dirty = False
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        """
+        Load a persisted index
+
+        Args:
+            directory (str): Directory the index was saved to
+            mmap (bool): Whether to memory-map the main vector arrays instead of reading them
+
+        Returns:
+            IVFIndex: The loaded index
+        """
+        with open(os.path.join(directory, "meta.json"), 'r') as f:
+            meta = json.load(f)
+
+        index = cls(nlist=meta['nlist'], nprobe=meta['nprobe'], compact_ratio=meta['compact_ratio'])
+        mmap_mode = "r" if mmap else None
+        for name in cls.FILES:
+            setattr(index, name, np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode))
+        for name in cls.PENDING_FILES:
+            setattr(index, name, np.load(os.path.join(directory, f"{name}.npy")))
+
+        # Offsets are updated in place by compact()
+        index.offsets = np.array(index.offsets)
+        return index
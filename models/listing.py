@@ -0,0 +1,288 @@
+# Listing Module
+# Responsible for the compact listing record types passed through the pipeline
+
+from utils.helpers import parse_numeric
+
+# Listing fields in display order, with their labels
+LISTING_LABELS = {
+    'neighborhood': 'Neighborhood',
+    'price': 'Price',
+    'bedrooms': 'Bedrooms',
+    'bathrooms': 'Bathrooms',
+    'house_size': 'House Size',
+    'description': 'Description',
+    'neighborhood_description': 'Neighborhood Description',
+}
+LISTING_FIELDS = tuple(LISTING_LABELS)
+
+# Short fact fields shown above the descriptions
+DETAIL_FIELDS = LISTING_FIELDS[:5]
+
+# Numeric fields, whose parsed numbers are kept next to the display strings as <field>_value
+NUMERIC_FIELDS = ('price', 'bedrooms', 'bathrooms', 'house_size')
+
+
+def _parse_value(value):
+    number = parse_numeric(value)
+    if number is None:
+        return None
+    return int(number) if number.is_integer() else number
+
+
+class Listing:
+    """
+    Real estate listing with its display strings and parsed numeric fields.
+
+    Uses __slots__ instead of a per-instance dict, and is treated as immutable so results
+    can share instances instead of copying them. The display strings are kept exactly as
+    given (e.g. "1 full, 1 half", "Studio" or "$800,000 - $900,000"), and the first number
+    in each numeric field is parsed once into price_value, bedrooms_value, bathrooms_value
+    and house_size_value for filtering. Item access (listing['price']) returns the display
+    strings, so code written against listing dicts keeps working.
+    """
+
+    __slots__ = ('listing_id', 'neighborhood', 'price', 'bedrooms', 'bathrooms', 'house_size',
+                 'description', 'neighborhood_description',
+                 'price_value', 'bedrooms_value', 'bathrooms_value', 'house_size_value')
+
+    def __init__(self, neighborhood="", price="", bedrooms="", bathrooms="", house_size="",
+                 description="", neighborhood_description="", listing_id=None, values=None):
+        """
+        Initialize the Listing.
+
+        Args:
+            neighborhood (str): Neighborhood name
+            price (str): Price as displayed, e.g. "$850,000"
+            bedrooms (str): Bedrooms as displayed, e.g. "3" or "Studio"
+            bathrooms (str): Bathrooms as displayed, e.g. "2.5" or "1 full, 1 half"
+            house_size (str): House size as displayed, e.g. "2,500 sqft"
+            description (str): Property description
+            neighborhood_description (str): Neighborhood description
+            listing_id (int, optional): Id of the listing in the vector database
+            values (dict, optional): Already parsed numbers by field name, instead of parsing
+                the display strings
+        """
+        self.listing_id = listing_id
+        self.neighborhood = neighborhood
+        self.price = price
+        self.bedrooms = bedrooms
+        self.bathrooms = bathrooms
+        self.house_size = house_size
+        self.description = description
+        self.neighborhood_description = neighborhood_description
+        if values is None:
+            values = {field: _parse_value(getattr(self, field)) for field in NUMERIC_FIELDS}
+        self.price_value = values.get('price')
+        self.bedrooms_value = values.get('bedrooms')
+        self.bathrooms_value = values.get('bathrooms')
+        self.house_size_value = values.get('house_size')
+
+    @classmethod
+    def from_dict(cls, data, listing_id=None):
+        """
+        Create a listing from a listing dictionary with display strings (as in listings.json)
+
+        Args:
+            data (dict): Listing dictionary
+            listing_id (int, optional): Id of the listing
+
+        Returns:
+            Listing: The listing
+        """
+        return cls(
+            *('' if data.get(field) is None else str(data[field]) for field in LISTING_FIELDS),
+            listing_id=data.get('listing_id', listing_id)
+        )
+
+    @classmethod
+    def from_metadata(cls, metadata):
+        """
+        Create a listing from vector database metadata, using the stored numbers instead of
+        parsing the display strings again
+
+        Args:
+            metadata (dict): Document metadata
+
+        Returns:
+            Listing: The listing
+        """
+        values = None
+        if 'price_value' in metadata:
+            values = {field: metadata.get(f"{field}_value") for field in NUMERIC_FIELDS}
+        return cls(
+            *(metadata.get(field, '') for field in LISTING_FIELDS),
+            listing_id=metadata.get('id'),
+            values=values
+        )
+
+    def with_listing_id(self, listing_id):
+        """
+        Create the same listing under another id, without parsing its fields again
+
+        Args:
+            listing_id (int): Id of the listing
+
+        Returns:
+            Listing: The listing with the given id
+        """
+        return Listing(
+            *(getattr(self, field) for field in LISTING_FIELDS),
+            listing_id=listing_id,
+            values={field: getattr(self, f"{field}_value") for field in NUMERIC_FIELDS}
+        )
+
+    def to_dict(self):
+        """
+        Convert to a listing dictionary with display strings (as in listings.json)
+
+        Returns:
+            dict: Listing dictionary
+        """
+        return {field: getattr(self, field) for field in LISTING_FIELDS}
+
+    def to_metadata(self):
+        """
+        Convert to vector database metadata, including the parsed numbers for range filters
+
+        Returns:
+            dict: Document metadata
+        """
+        metadata = self.to_dict()
+        if self.listing_id is not None:
+            metadata['id'] = self.listing_id
+        for field in NUMERIC_FIELDS:
+            value = getattr(self, f"{field}_value")
+            if value is not None:
+                metadata[f"{field}_value"] = value
+        return metadata
+
+    def to_text(self):
+        """
+        Build the text representation that is embedded for semantic search
+
+        Returns:
+            str: Listing text
+        """
+        return f"""
+            Neighborhood: {self.neighborhood}
+            Price: {self.price}
+            Bedrooms: {self.bedrooms}
+            Bathrooms: {self.bathrooms}
+            House Size: {self.house_size}
+
+            Description: {self.description}
+
+            Neighborhood Description: {self.neighborhood_description}
+            """
+
+    def __getitem__(self, key):
+        if key == 'listing_id':
+            return self.listing_id
+        if key in LISTING_LABELS:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __contains__(self, key):
+        return key == 'listing_id' or key in LISTING_LABELS
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __eq__(self, other):
+        if not isinstance(other, Listing):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"Listing(listing_id={self.listing_id!r}, neighborhood={self.neighborhood!r}, price={self.price!r})"
+
+
+class ScoredListing:
+    """
+    Search result referencing a shared Listing, with its similarity score and an optional
+    personalized description.
+    """
+
+    __slots__ = ('listing', 'similarity_score', 'personalized_description')
+
+    def __init__(self, listing, similarity_score, personalized_description=None):
+        """
+        Initialize the ScoredListing.
+
+        Args:
+            listing (Listing): The matching listing
+            similarity_score (float): Similarity to the query
+            personalized_description (str, optional): Description tailored to the buyer
+        """
+        self.listing = listing
+        self.similarity_score = similarity_score
+        self.personalized_description = personalized_description
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Create a scored listing from a result dictionary
+
+        Args:
+            data (dict): Listing dictionary with 'similarity_score'
+
+        Returns:
+            ScoredListing: The scored listing
+        """
+        return cls(Listing.from_dict(data), data.get('similarity_score'), data.get('personalized_description'))
+
+    def with_personalized_description(self, personalized_description):
+        """
+        Create a result with a personalized description, sharing the same Listing
+
+        Args:
+            personalized_description (str): Description tailored to the buyer
+
+        Returns:
+            ScoredListing: The personalized result
+        """
+        return ScoredListing(self.listing, self.similarity_score, personalized_description)
+
+    def to_dict(self):
+        """
+        Convert to a flat result dictionary
+
+        Returns:
+            dict: Listing fields, listing id, similarity score and personalized description
+        """
+        data = self.listing.to_dict()
+        data['listing_id'] = self.listing.listing_id
+        data['similarity_score'] = self.similarity_score
+        if self.personalized_description is not None:
+            data['personalized_description'] = self.personalized_description
+        return data
+
+    def __getitem__(self, key):
+        if key == 'similarity_score':
+            return self.similarity_score
+        if key == 'original_description':
+            return self.listing.description
+        if key == 'personalized_description':
+            if self.personalized_description is None:
+                raise KeyError(key)
+            return self.personalized_description
+        return self.listing[key]
+
+    def __contains__(self, key):
+        if key == 'personalized_description':
+            return self.personalized_description is not None
+        return key in ('similarity_score', 'original_description') or key in self.listing
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __repr__(self):
+        return f"ScoredListing({self.listing!r}, similarity_score={self.similarity_score!r})"
@@ -3,9 +3,10 @@
 
 import os
 import json
-from langchain_community.llms import OpenAI
 from langchain.prompts import PromptTemplate
 from langchain.chains import LLMChain
+from models.listing import Listing
+from utils.client_registry import get_client_registry
 
 class ListingGenerator:
     """
@@ -19,11 +20,8 @@ class ListingGenerator:
         Args:
             temperature (float): The temperature for the LLM
         """
-        self.llm = OpenAI(
-            temperature=temperature,
-            openai_api_key=os.environ.get("OPENAI_API_KEY"),
-            openai_api_base=os.environ.get("OPENAI_API_BASE", "https://openai.vocareum.com/v1")
-        )
+        # Use the shared pooled and rate-limited client
+        self.llm = get_client_registry().get_llm(temperature=temperature)
         
         # Create prompt template for generating listings
         self.listing_template = """
@@ -66,7 +64,7 @@ class ListingGenerator:
             num_listings (int): Number of listings to generate
             
         Returns:
-            list: List of dictionaries containing property listings
+            list: List of Listing objects
         """
         # Generate listings
         listings = []
@@ -102,7 +100,7 @@ class ListingGenerator:
                         neighborhood_desc = part.replace("Neighborhood Description:", "").strip()
                 
                 # Create structured listing
-                structured_listing = {
+                structured_listing = Listing.from_dict({
                     'neighborhood': details.get('Neighborhood', ''),
                     'price': details.get('Price', ''),
                     'bedrooms': details.get('Bedrooms', ''),
@@ -110,7 +108,7 @@ class ListingGenerator:
                     'house_size': details.get('House Size', ''),
                     'description': description,
                     'neighborhood_description': neighborhood_desc
-                }
+                })
                 
                 structured_listings.append(structured_listing)
             except Exception as e:
@@ -124,7 +122,7 @@ class ListingGenerator:
         Save listings to a JSON file
         
         Args:
-            listings (list): List of listing dictionaries
+            listings (list): List of Listing objects
             file_path (str): Path to save the listings
         """
         # Create directory if it doesn't exist
@@ -132,7 +130,7 @@ class ListingGenerator:
         
         # Save listings to file
         with open(file_path, 'w') as f:
-            json.dump(listings, f, indent=4)
+            json.dump([listing.to_dict() for listing in listings], f, indent=4)
         
         print(f"All {len(listings)} listings saved to '{file_path}'")
     
@@ -144,10 +142,10 @@ class ListingGenerator:
             file_path (str): Path to the listings file
             
         Returns:
-            list: List of listing dictionaries
+            list: List of Listing objects
         """
         with open(file_path, 'r') as f:
-            listings = json.load(f)
+            listings = [Listing.from_dict(data) for data in json.load(f)]
         
         print(f"Loaded {len(listings)} listings from '{file_path}'")
         return listings
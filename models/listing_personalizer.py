@@ -1,10 +1,10 @@
 # Listing Personalizer Module
 # Responsible for personalizing listing descriptions based on buyer preferences
 
-from langchain_community.llms import OpenAI
 from langchain.prompts import PromptTemplate
 from langchain.chains import LLMChain
-import os
+from models.listing import ScoredListing, LISTING_FIELDS, LISTING_LABELS, DETAIL_FIELDS
+from utils.client_registry import get_client_registry
 
 class ListingPersonalizer:
     """
@@ -18,11 +18,8 @@ class ListingPersonalizer:
         Args:
             temperature (float): The temperature for the LLM
         """
-        self.llm = OpenAI(
-            temperature=temperature,
-            openai_api_key=os.environ.get("OPENAI_API_KEY"),
-            openai_api_base=os.environ.get("OPENAI_API_BASE", "https://openai.vocareum.com/v1")
-        )
+        # Use the shared pooled and rate-limited client
+        self.llm = get_client_registry().get_llm(temperature=temperature)
         
         # Create prompt template for personalizing descriptions
         self.personalize_template = """
@@ -51,49 +48,43 @@ class ListingPersonalizer:
         
         # Create LLMChain for personalizing descriptions
         self.personalize_prompt = PromptTemplate(
-            input_variables=["preferences", "neighborhood", "price", "bedrooms", 
-                            "bathrooms", "house_size", "description", "neighborhood_description"],
+            input_variables=["preferences", *LISTING_FIELDS],
             template=self.personalize_template
         )
         self.personalize_chain = LLMChain(llm=self.llm, prompt=self.personalize_prompt)
     
-    def personalize_listings(self, matching_listings, buyer_preferences):
+    def personalize_listings(self, matching_listings, buyer_preferences, verbose=True):
         """
         Personalize listing descriptions based on buyer preferences
         
         Args:
-            matching_listings (list): List of matching listings
+            matching_listings (list): List of ScoredListing results (or result dictionaries)
             buyer_preferences (list): List of buyer preference answers
+            verbose (bool): Whether to print progress for each listing
             
         Returns:
-            list: List of listings with personalized descriptions
+            list: List of ScoredListing results with personalized descriptions
         """
         # Combine buyer preferences into a single text
         preferences_text = "\n".join([f"- {pref}" for pref in buyer_preferences])
         
         # Personalize descriptions for each matching listing
         personalized_listings = []
-        for listing in matching_listings:
-            print(f"Personalizing description for listing in {listing['neighborhood']}...")
+        for result in matching_listings:
+            if not isinstance(result, ScoredListing):
+                result = ScoredListing.from_dict(result)
+            
+            if verbose:
+                print(f"Personalizing description for listing in {result.listing.neighborhood}...")
             
             # Generate personalized description
             personalized_description = self.personalize_chain.run(
                 preferences=preferences_text,
-                neighborhood=listing['neighborhood'],
-                price=listing['price'],
-                bedrooms=listing['bedrooms'],
-                bathrooms=listing['bathrooms'],
-                house_size=listing['house_size'],
-                description=listing['description'],
-                neighborhood_description=listing['neighborhood_description']
+                **result.listing.to_dict()
             )
             
-            # Create a copy of the listing with personalized description
-            personalized_listing = listing.copy()
-            personalized_listing['original_description'] = listing['description']
-            personalized_listing['personalized_description'] = personalized_description.strip()
-            
-            personalized_listings.append(personalized_listing)
+            # The personalized result shares the listing instead of copying it
+            personalized_listings.append(result.with_personalized_description(personalized_description.strip()))
         
         return personalized_listings
     
@@ -107,11 +98,8 @@ class ListingPersonalizer:
         print("\n=== PERSONALIZED LISTINGS ===\n")
         for i, listing in enumerate(personalized_listings):
             print(f"Personalized Match {i+1}:")
-            print(f"Neighborhood: {listing['neighborhood']}")
-            print(f"Price: {listing['price']}")
-            print(f"Bedrooms: {listing['bedrooms']}")
-            print(f"Bathrooms: {listing['bathrooms']}")
-            print(f"House Size: {listing['house_size']}")
+            for field in DETAIL_FIELDS:
+                print(f"{LISTING_LABELS[field]}: {listing[field]}")
             print(f"\nORIGINAL Description: {listing['original_description']}")
             print(f"\nPERSONALIZED Description: {listing['personalized_description']}")
             print(f"\nNeighborhood Description: {listing['neighborhood_description']}")
@@ -1,6 +1,8 @@
 # Preference Manager Module
 # Responsible for collecting and processing buyer preferences
 
+from models.constraint_extractor import ConstraintExtractor
+
 class PreferenceManager:
     """
     Class for managing buyer preferences.
@@ -27,6 +29,9 @@ class PreferenceManager:
             "Easy access to a reliable bus line, proximity to a major highway, and bike-friendly roads.",
             "A balance between suburban tranquility and access to urban amenities like restaurants and theaters."
         ]
+        
+        # Rule-based extractor for structured constraints (bedrooms, price, size, amenities)
+        self.constraint_extractor = ConstraintExtractor()
     
     def collect_preferences(self, questions=None, interactive=False, default_answers=None):
         """
@@ -74,6 +79,18 @@ class PreferenceManager:
         """
         return " ".join(preferences)
     
+    def extract_constraints(self, preferences):
+        """
+        Extract structured search constraints from preference answers
+        
+        Args:
+            preferences (list): List of preference answers
+            
+        Returns:
+            dict: Constraints such as min_bedrooms, max_price, min_size and amenities
+        """
+        return self.constraint_extractor.extract_all(preferences)
+    
     def display_preferences(self, questions, preferences):
         """
         Display the questions and corresponding preferences
@@ -0,0 +1,198 @@
+# Similarity Graph Module
+# Responsible for precomputing "more like this" neighbors between listings
+
+import os
+import json
+
+import numpy as np
+
+from models.ivf_index import normalize
+
+class SimilarityGraph:
+    """
+    Precomputed k-nearest-neighbor graph over listing embeddings.
+
+    Listings are identified by their row, in the order their embeddings were given; callers
+    keep the mapping from rows to their own ids. Neighbors are stored as an (n, k) int32 array
+    of rows and an (n, k) float16 array of cosine similarities, so similar_to() is an array
+    slice. Rows with fewer than k other listings are padded with -1. The embeddings themselves
+    are not kept.
+    """
+
+    FILES = ("neighbors", "scores")
+
+    def __init__(self, k=10, max_block_elements=1 << 24):
+        """
+        Initialize the SimilarityGraph.
+
+        Args:
+            k (int): Number of neighbors stored per listing
+            max_block_elements (int): Upper bound on similarity matrix entries computed at once
+        """
+        self.k = k
+        self.max_block_elements = max_block_elements
+        self.neighbors = np.empty((0, k), dtype=np.int32)
+        self.scores = np.empty((0, k), dtype=np.float16)
+
+    def __len__(self):
+        return len(self.neighbors)
+
+    def _block_rows(self, num_columns):
+        return max(1, self.max_block_elements // max(1, num_columns))
+
+    def _top_k(self, row_indices, scores):
+        """
+        Select the k best candidates per row, best first, padding with -1
+
+        Args:
+            row_indices (np.ndarray): Candidate row numbers of shape (b, c)
+            scores (np.ndarray): Candidate scores of shape (b, c)
+
+        Returns:
+            tuple: (neighbors int32 array, scores float16 array), both of shape (b, k)
+        """
+        b, c = scores.shape
+        k = min(self.k, c)
+        if k < c:
+            best = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        else:
+            best = np.broadcast_to(np.arange(c), (b, c))
+        best_scores = np.take_along_axis(scores, best, axis=1)
+        order = np.argsort(-best_scores, axis=1, kind="stable")
+        best = np.take_along_axis(best, order, axis=1)
+        best_scores = np.take_along_axis(best_scores, order, axis=1)
+        best_rows = np.take_along_axis(row_indices, best, axis=1)
+        best_rows[~np.isfinite(best_scores)] = -1
+
+        neighbors = np.full((b, self.k), -1, dtype=np.int32)
+        padded_scores = np.full((b, self.k), -np.inf, dtype=np.float16)
+        neighbors[:, :k] = best_rows
+        padded_scores[:, :k] = best_scores
+        return neighbors, padded_scores
+
+    def _neighbors_for(self, embeddings, start, end):
+        """
+        Compute the neighbors of rows [start, end) against all rows, in blocks
+        """
+        num_rows = len(embeddings)
+        neighbors = np.empty((end - start, self.k), dtype=np.int32)
+        scores = np.empty((end - start, self.k), dtype=np.float16)
+        all_rows = np.arange(num_rows, dtype=np.int32)
+
+        step = self._block_rows(num_rows)
+        for block_start in range(start, end, step):
+            block_end = min(block_start + step, end)
+            sims = embeddings[block_start:block_end] @ embeddings.T
+            # Exclude each listing from its own neighbors
+            sims[np.arange(block_end - block_start), np.arange(block_start, block_end)] = -np.inf
+            block_neighbors, block_scores = self._top_k(
+                np.broadcast_to(all_rows, sims.shape), sims
+            )
+            neighbors[block_start - start:block_end - start] = block_neighbors
+            scores[block_start - start:block_end - start] = block_scores
+        return neighbors, scores
+
+    def build(self, embeddings):
+        """
+        Build the graph from scratch
+
+        Args:
+            embeddings (np.ndarray): Listing embeddings of shape (n, d), one row per listing
+        """
+        embeddings = normalize(embeddings)
+        self.neighbors, self.scores = self._neighbors_for(embeddings, 0, len(embeddings))
+
+    def add(self, embeddings, existing_embeddings):
+        """
+        Add listings as new rows, computing their neighbors and updating existing rows they displace
+
+        Args:
+            embeddings (np.ndarray): New listing embeddings of shape (m, d)
+            existing_embeddings (np.ndarray): Embeddings of the current rows, in row order
+        """
+        num_old = len(self.neighbors)
+        if num_old == 0:
+            self.build(embeddings)
+            return
+
+        new_embeddings = normalize(embeddings).reshape(-1, existing_embeddings.shape[1])
+        all_embeddings = np.concatenate([normalize(existing_embeddings), new_embeddings])
+        num_new = len(new_embeddings)
+
+        # Merge the new listings into the neighbor lists of existing rows
+        neighbors = np.array(self.neighbors)
+        scores = np.empty_like(self.scores)
+        new_rows = np.arange(num_old, num_old + num_new, dtype=np.int32)
+        step = self._block_rows((num_new + self.k) * new_embeddings.shape[1])
+        for start in range(0, num_old, step):
+            end = min(start + step, num_old)
+            sims = all_embeddings[start:end] @ new_embeddings.T
+            candidate_rows = np.concatenate(
+                [neighbors[start:end], np.broadcast_to(new_rows, (end - start, num_new))], axis=1
+            )
+            # Recompute current neighbor scores in float32 so float16 rounding doesn't accumulate
+            current = neighbors[start:end]
+            current_scores = np.einsum('ij,ikj->ik', all_embeddings[start:end], all_embeddings[current])
+            current_scores[current < 0] = -np.inf
+            candidate_scores = np.concatenate([current_scores, sims], axis=1)
+            neighbors[start:end], scores[start:end] = self._top_k(candidate_rows, candidate_scores)
+
+        new_neighbors, new_scores = self._neighbors_for(all_embeddings, num_old, num_old + num_new)
+        self.neighbors = np.concatenate([neighbors, new_neighbors])
+        self.scores = np.concatenate([scores, new_scores])
+
+    def similar_to(self, row, k=None):
+        """
+        Look up the most similar listings to a listing
+
+        Args:
+            row (int): Row of the listing
+            k (int, optional): Number of neighbors (at most the graph's k)
+
+        Returns:
+            tuple: (array of neighbor rows, array of cosine similarities), most similar first
+        """
+        if not 0 <= row < len(self.neighbors):
+            raise ValueError(f"Row {row} is not in the similarity graph.")
+
+        neighbors = self.neighbors[row, :k or self.k]
+        scores = self.scores[row, :k or self.k]
+        valid = neighbors >= 0
+        return neighbors[valid], scores[valid].astype(np.float32)
+
+    def save(self, directory):
+        """
+        Persist the graph as .npy files that can be memory-mapped by load()
+
+        Args:
+            directory (str): Directory to write the graph to
+        """
+        os.makedirs(directory, exist_ok=True)
+        for name in self.FILES:
+            tmp_path = os.path.join(directory, f"{name}.tmp.npy")
+            np.save(tmp_path, np.asarray(getattr(self, name)))
+            os.replace(tmp_path, os.path.join(directory, f"{name}.npy"))
+
+        with open(os.path.join(directory, "meta.json"), 'w') as f:
+            json.dump({'k': self.k}, f)
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        """
+        Load a persisted graph
+
+        Args:
+            directory (str): Directory the graph was saved to
+            mmap (bool): Whether to memory-map the arrays instead of reading them
+
+        Returns:
+            SimilarityGraph: The loaded graph
+        """
+        with open(os.path.join(directory, "meta.json"), 'r') as f:
+            meta = json.load(f)
+
+        graph = cls(k=meta['k'])
+        mmap_mode = "r" if mmap else None
+        for name in cls.FILES:
+            setattr(graph, name, np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode))
+        return graph
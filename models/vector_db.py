@@ -2,27 +2,70 @@
 # Responsible for managing the vector database operations
 
 import os
-from langchain_community.embeddings.openai import OpenAIEmbeddings
+import json
+import shutil
+import threading
+from collections import OrderedDict
+import numpy as np
 from langchain_community.vectorstores import Chroma
 from langchain.schema import Document
+from models.ivf_index import IVFIndex
+from models.similarity_graph import SimilarityGraph
+from models.constraint_extractor import constraints_to_filter, satisfies_constraints, find_amenities
+from models.listing import Listing, ScoredListing, NUMERIC_FIELDS
+from utils.client_registry import get_client_registry
 
 class VectorDBManager:
     """
     Class for managing vector database operations.
     """
     
-    def __init__(self, persist_directory="data/vectordb"):
+    # Candidates fetched per requested result when constraints re-rank them
+    CONSTRAINT_FETCH_FACTOR = 4
+    
+    # Similarity bonus per requested amenity mentioned in a listing
+    AMENITY_BOOST = 0.02
+    
+    # Documents read from the database per request when loading all embeddings
+    EMBEDDING_PAGE_SIZE = 10000
+    
+    # Similar listings stored per listing in the "more like this" graph
+    SIMILARITY_GRAPH_K = 10
+    
+    # Most recently returned listings kept for reuse by later results
+    LISTING_CACHE_SIZE = 1024
+    
+    def __init__(self, persist_directory="data/vectordb", index_backend="chroma", nlist=None, nprobe=8):
         """
         Initialize the VectorDBManager.
         
         Args:
             persist_directory (str): Directory to persist the vector database
+            index_backend (str): Search backend, "chroma" (HNSW) or "ivf" (inverted-file index)
+            nlist (int, optional): Number of IVF lists (defaults to 4 * sqrt(number of listings))
+            nprobe (int): Number of IVF lists scanned per query
         """
+        if index_backend not in ("chroma", "ivf"):
+            raise ValueError(f"Unsupported index backend: {index_backend}")
+        
         self.persist_directory = persist_directory
-        self.embeddings = OpenAIEmbeddings(
-            openai_api_key=os.environ.get("OPENAI_API_KEY"),
-            openai_api_base=os.environ.get("OPENAI_API_BASE", "https://openai.vocareum.com/v1")
-        )
+        self.index_backend = index_backend
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.ivf_directory = os.path.join(persist_directory, "ivf")
+        self.ivf_index = None
+        self.ivf_doc_ids = []
+        self.ivf_position_of = {}
+        self._ivf_lock = threading.Lock()
+        self._graph_lock = threading.Lock()
+        self.graph_directory = os.path.join(persist_directory, "similarity_graph")
+        self.similarity_graph = None
+        self.graph_doc_ids = []
+        self.graph_row_of = {}
+        self._listing_cache = OrderedDict()
+        self._listing_cache_lock = threading.Lock()
+        # Use the shared pooled and rate-limited client
+        self.embeddings = get_client_registry().get_embeddings()
         
         # Create directory if it doesn't exist
         os.makedirs(persist_directory, exist_ok=True)
@@ -37,64 +80,112 @@ class VectorDBManager:
         except:
             print(f"No existing database found at {persist_directory}. Will create a new one when data is added.")
             self.vectordb = None
+        
+        # Load a previously built IVF index, memory-mapped, with either backend so that
+        # listings added through a Chroma session keep it up to date
+        if os.path.exists(os.path.join(self.ivf_directory, "meta.json")):
+            with open(os.path.join(self.ivf_directory, "doc_ids.json"), 'r') as f:
+                ivf_doc_ids = json.load(f)
+            if len(ivf_doc_ids) == self.count():
+                self.ivf_index = IVFIndex.load(self.ivf_directory)
+                self.ivf_index.nprobe = nprobe
+                self.ivf_doc_ids = ivf_doc_ids
+                self.ivf_position_of = {doc_id: position for position, doc_id in enumerate(ivf_doc_ids)}
+                print(f"Loaded IVF index with {len(self.ivf_index)} vectors from {self.ivf_directory}")
+            else:
+                print(f"Discarding stale IVF index in {self.ivf_directory}")
+                self.invalidate_ivf_index()
+        
+        # Load a previously built similarity graph, memory-mapped, unless it does not cover the
+        # stored listings; a missing graph is built by the first similar_to() call
+        if os.path.exists(os.path.join(self.graph_directory, "meta.json")):
+            with open(os.path.join(self.graph_directory, "doc_ids.json"), 'r') as f:
+                graph_doc_ids = json.load(f)
+            if len(graph_doc_ids) == self.count():
+                self.similarity_graph = SimilarityGraph.load(self.graph_directory)
+                self.graph_doc_ids = graph_doc_ids
+                self.graph_row_of = {doc_id: row for row, doc_id in enumerate(graph_doc_ids)}
     
-    def prepare_documents_for_embedding(self, listings):
+    def prepare_documents_for_embedding(self, listings, start_id=0):
         """
-        Convert listing dictionaries to Document objects for embedding
+        Convert listings to Document objects for embedding
         
         Args:
-            listings (list): List of listing dictionaries
+            listings (list): List of Listing objects or listing dictionaries
+            start_id (int): Id assigned to the first listing
             
         Returns:
-            list: List of Document objects
+            list: List of Document objects, whose Chroma ids are their listing ids as strings
         """
         documents = []
-        for i, listing in enumerate(listings):
-            # Create a combined text representation of the listing
-            text = f"""
-            Neighborhood: {listing['neighborhood']}
-            Price: {listing['price']}
-            Bedrooms: {listing['bedrooms']}
-            Bathrooms: {listing['bathrooms']}
-            House Size: {listing['house_size']}
-            
-            Description: {listing['description']}
-            
-            Neighborhood Description: {listing['neighborhood_description']}
-            """
+        for i, listing in enumerate(listings, start_id):
+            if not isinstance(listing, Listing):
+                listing = Listing.from_dict(listing)
+            listing = listing.with_listing_id(i)
             
-            # Create Document object with metadata
-            doc = Document(
-                page_content=text,
-                metadata={
-                    'id': i,
-                    'neighborhood': listing['neighborhood'],
-                    'price': listing['price'],
-                    'bedrooms': listing['bedrooms'],
-                    'bathrooms': listing['bathrooms'],
-                    'house_size': listing['house_size'],
-                    'description': listing['description'],
-                    'neighborhood_description': listing['neighborhood_description']
-                }
-            )
-            documents.append(doc)
+            # Metadata includes numeric copies of the constrained fields for range filters
+            documents.append(Document(page_content=listing.to_text(), metadata=listing.to_metadata()))
         
         return documents
     
+    def count(self):
+        """
+        Count the listings stored in the vector database
+        
+        Returns:
+            int: Number of stored listings (0 if the database is not initialized)
+        """
+        if not self.vectordb:
+            return 0
+        return self.vectordb._collection.count()
+    
+    def has_current_layout(self, sample_size=100):
+        """
+        Check whether the stored listings use the current document layout: Chroma ids equal to
+        the listing ids, and the parsed *_value numbers used by range filters
+        
+        Databases written by earlier versions store listings under random ids without the
+        numeric fields, so their search results, filters and similar listings do not line up.
+        
+        Args:
+            sample_size (int): Number of stored documents checked
+            
+        Returns:
+            bool: True if the sampled documents use the current layout
+        """
+        if not self.count():
+            return False
+        
+        stored = self.vectordb.get(include=['metadatas'], limit=sample_size)
+        if any(doc_id != str(metadata.get('id')) for doc_id, metadata in zip(stored['ids'], stored['metadatas'])):
+            return False
+        return any(
+            f"{field}_value" in metadata
+            for metadata in stored['metadatas']
+            for field in NUMERIC_FIELDS
+        )
+    
     def initialize_with_listings(self, listings):
         """
-        Initialize or update vector database with listings
+        Initialize the vector database with listings, replacing any stored listings
         
         Args:
-            listings (list): List of listing dictionaries
+            listings (list): List of Listing objects or listing dictionaries
         """
         # Prepare documents for embedding
         documents = self.prepare_documents_for_embedding(listings)
+        with self._listing_cache_lock:
+            self._listing_cache.clear()
         
-        # Initialize ChromaDB and add documents
+        # Chroma appends to an existing collection, which would duplicate listings and their ids
+        if self.count():
+            self.vectordb.delete_collection()
+        
+        # Initialize ChromaDB and add documents, stored under their listing ids
         self.vectordb = Chroma.from_documents(
             documents=documents,
             embedding=self.embeddings,
+            ids=[str(document.metadata['id']) for document in documents],
             persist_directory=self.persist_directory
         )
         
@@ -102,45 +193,455 @@ class VectorDBManager:
         self.vectordb.persist()
         
         print(f"Vector database initialized with {len(listings)} listings")
+        
+        # Rebuild the derived indexes so they cover the new contents
+        if self.index_backend == "ivf":
+            self.build_ivf_index()
+        else:
+            # Not used by this session; an IVF session rebuilds it on first search
+            self.invalidate_ivf_index()
+        self.build_similarity_graph()
     
-    def search(self, query, num_results=3):
+    def add_listings(self, listings):
         """
-        Search for listings that match a query
+        Add listings to an existing vector database, updating the IVF index and
+        similarity graph incrementally
         
         Args:
-            query (str): The search query
-            num_results (int): Number of results to return
+            listings (list): List of Listing objects or listing dictionaries
+        """
+        if not self.vectordb:
+            raise ValueError("Vector database not initialized. Call initialize_with_listings first.")
+        
+        documents = self.prepare_documents_for_embedding(listings, start_id=self.count())
+        doc_ids = self.vectordb.add_documents(documents, ids=[str(document.metadata['id']) for document in documents])
+        
+        if self.ivf_index is not None or self.similarity_graph is not None:
+            # Reuse the embeddings Chroma just computed instead of embedding again
+            stored = self.vectordb.get(ids=doc_ids, include=['embeddings'])
+            embeddings = np.asarray(stored['embeddings'], dtype=np.float32).reshape(len(stored['ids']), -1)
+        
+        if self.ivf_index is not None:
+            positions = np.arange(len(self.ivf_doc_ids), len(self.ivf_doc_ids) + len(stored['ids']))
+            self.ivf_index.add(embeddings, positions)
+            self.ivf_position_of.update(zip(stored['ids'], positions.tolist()))
+            self.ivf_doc_ids.extend(stored['ids'])
+            self.save_ivf_index()
+        
+        if self.similarity_graph is not None:
+            # The graph keeps no embeddings; fetch the existing listings' vectors from the database
+            self.similarity_graph.add(embeddings, self.get_embeddings(self.graph_doc_ids))
+            self.graph_row_of.update((doc_id, len(self.graph_doc_ids) + i) for i, doc_id in enumerate(stored['ids']))
+            self.graph_doc_ids.extend(stored['ids'])
+            self.save_similarity_graph()
+        
+        print(f"Added {len(listings)} listings to the vector database")
+    
+    def load_stored_embeddings(self, out_path=None):
+        """
+        Load all document ids and embeddings stored in the vector database
+        
+        Embeddings are read page by page into one preallocated float32 array, so the corpus is
+        never held as Python lists.
+        
+        Args:
+            out_path (str, optional): .npy file to write the embeddings to and memory-map
+                instead of holding them in memory
+        
+        Returns:
+            tuple: (list of document ids, float32 array of embeddings)
+        """
+        if not self.vectordb:
+            raise ValueError("Vector database not initialized. Call initialize_with_listings first.")
+        
+        total = self.count()
+        doc_ids = []
+        embeddings = None
+        for offset in range(0, total, self.EMBEDDING_PAGE_SIZE):
+            page = self.vectordb.get(include=['embeddings'], limit=self.EMBEDDING_PAGE_SIZE, offset=offset)
+            page_embeddings = np.asarray(page['embeddings'], dtype=np.float32).reshape(len(page['ids']), -1)
+            if embeddings is None:
+                shape = (total, page_embeddings.shape[1])
+                if out_path:
+                    embeddings = np.lib.format.open_memmap(out_path, mode='w+', dtype=np.float32, shape=shape)
+                else:
+                    embeddings = np.empty(shape, dtype=np.float32)
+            embeddings[offset:offset + len(page_embeddings)] = page_embeddings
+            doc_ids.extend(page['ids'])
+        
+        if embeddings is None:
+            return doc_ids, np.empty((0, 0), dtype=np.float32)
+        return doc_ids, embeddings[:len(doc_ids)]
+    
+    def get_embeddings(self, doc_ids):
+        """
+        Load the stored embeddings of documents, page by page, in the given order
+        
+        Args:
+            doc_ids (list): Document ids
+        
+        Returns:
+            np.ndarray: float32 array of embeddings, one row per document id
+        """
+        embeddings = None
+        for start in range(0, len(doc_ids), self.EMBEDDING_PAGE_SIZE):
+            page_ids = doc_ids[start:start + self.EMBEDDING_PAGE_SIZE]
+            page = self.vectordb.get(ids=page_ids, include=['embeddings'])
+            if len(page['ids']) != len(page_ids):
+                raise ValueError("Some documents are missing from the vector database.")
+            page_embeddings = np.asarray(page['embeddings'], dtype=np.float32).reshape(len(page_ids), -1)
+            if embeddings is None:
+                embeddings = np.empty((len(doc_ids), page_embeddings.shape[1]), dtype=np.float32)
+            order = {doc_id: i for i, doc_id in enumerate(page['ids'])}
+            embeddings[start:start + len(page_ids)] = page_embeddings[[order[doc_id] for doc_id in page_ids]]
+        
+        if embeddings is None:
+            return np.empty((0, 0), dtype=np.float32)
+        return embeddings
+    
+    def build_ivf_index(self, nlist=None):
+        """
+        Build an IVF index from the stored embeddings and persist it
+        
+        Args:
+            nlist (int, optional): Number of IVF lists (defaults to the configured nlist)
+        """
+        doc_ids, embeddings = self.load_stored_embeddings()
+        
+        # Train into a local index and publish it last, so searches never see an untrained index
+        ivf_index = IVFIndex(nlist=nlist or self.nlist, nprobe=self.nprobe)
+        ivf_index.build(embeddings, np.arange(len(doc_ids)))
+        self.ivf_doc_ids = list(doc_ids)
+        self.ivf_position_of = {doc_id: position for position, doc_id in enumerate(doc_ids)}
+        self.ivf_index = ivf_index
+        self.save_ivf_index()
+        
+        print(f"IVF index built with {len(doc_ids)} vectors in {ivf_index.nlist} lists")
+    
+    def ensure_ivf_index(self):
+        """
+        Build the IVF index if it does not exist yet, once even when called from several threads
+        """
+        if self.ivf_index is not None:
+            return
+        with self._ivf_lock:
+            if self.ivf_index is None:
+                self.build_ivf_index()
+    
+    def invalidate_ivf_index(self):
+        """
+        Discard the IVF index and its persisted files
+        """
+        self.ivf_index = None
+        self.ivf_doc_ids = []
+        self.ivf_position_of = {}
+        if os.path.exists(self.ivf_directory):
+            shutil.rmtree(self.ivf_directory)
+    
+    def save_ivf_index(self):
+        """
+        Persist the IVF index and its document id mapping
+        """
+        self.ivf_index.save(self.ivf_directory)
+        with open(os.path.join(self.ivf_directory, "doc_ids.json"), 'w') as f:
+            json.dump(self.ivf_doc_ids, f)
+    
+    def build_similarity_graph(self, k=None):
+        """
+        Build the "more like this" k-nearest-neighbor graph from the stored embeddings and persist it
+        
+        Args:
+            k (int, optional): Number of similar listings stored per listing (defaults to SIMILARITY_GRAPH_K)
+        """
+        if not self.vectordb:
+            raise ValueError("Vector database not initialized. Call initialize_with_listings first.")
+        
+        k = k or self.SIMILARITY_GRAPH_K
+        doc_ids, embeddings = self.load_stored_embeddings()
+        
+        # Build into a local graph and publish it last, so lookups never see a partial graph
+        similarity_graph = SimilarityGraph(k=k)
+        similarity_graph.build(embeddings)
+        self.graph_doc_ids = list(doc_ids)
+        self.graph_row_of = {doc_id: row for row, doc_id in enumerate(doc_ids)}
+        self.similarity_graph = similarity_graph
+        self.save_similarity_graph()
+        
+        print(f"Similarity graph built for {len(doc_ids)} listings with {k} neighbors each")
+    
+    def save_similarity_graph(self):
+        """
+        Persist the similarity graph and its document id mapping
+        """
+        self.similarity_graph.save(self.graph_directory)
+        with open(os.path.join(self.graph_directory, "doc_ids.json"), 'w') as f:
+            json.dump(self.graph_doc_ids, f)
+    
+    def similar_to(self, listing_id, k=3):
+        """
+        Find listings similar to a listing from the precomputed graph, without an embedding call
+        
+        Args:
+            listing_id (int): Id of the listing (the 'listing_id' of a search result)
+            k (int): Number of similar listings to return (at most the graph's k)
             
         Returns:
-            list: List of matching listings with similarity scores
+            list: List of ScoredListing results
         """
         if not self.vectordb:
             raise ValueError("Vector database not initialized. Call initialize_with_listings first.")
         
-        # Perform similarity search
-        results = self.vectordb.similarity_search_with_score(
-            query,
-            k=num_results
+        # Databases populated before the graph existed get it on first use, built once
+        if self.similarity_graph is None:
+            with self._graph_lock:
+                if self.similarity_graph is None:
+                    self.build_similarity_graph()
+        
+        row = self.graph_row_of.get(str(listing_id))
+        if row is None:
+            raise ValueError(f"Listing {listing_id} is not in the similarity graph.")
+        
+        neighbor_rows, scores = self.similarity_graph.similar_to(row, min(k, self.similarity_graph.k))
+        doc_ids = [self.graph_doc_ids[neighbor_row] for neighbor_row in neighbor_rows]
+        if not doc_ids:
+            return []
+        stored = self.vectordb.get(ids=doc_ids, include=['metadatas'])
+        metadata_by_id = dict(zip(stored['ids'], stored['metadatas']))
+        
+        # Same 1 - squared L2 distance convention as search (2 * cosine - 1 for unit-length embeddings)
+        return [
+            self.listing_from_metadata(doc_id, metadata_by_id[doc_id], float(2 * score - 1))
+            for doc_id, score in zip(doc_ids, scores)
+            if doc_id in metadata_by_id
+        ]
+    
+    def listing_from_metadata(self, doc_id, metadata, similarity):
+        """
+        Build a search result from stored document metadata
+        
+        Recently returned listings are kept in a bounded LRU cache by document id, so repeated
+        hits share one Listing instead of rebuilding it.
+        
+        Args:
+            doc_id (str): Document id of the listing
+            metadata (dict): Document metadata
+            similarity (float): Similarity score of the listing
+            
+        Returns:
+            ScoredListing: Listing with similarity score
+        """
+        with self._listing_cache_lock:
+            listing = self._listing_cache.get(doc_id)
+            if listing is not None:
+                self._listing_cache.move_to_end(doc_id)
+        
+        if listing is None:
+            listing = Listing.from_metadata(metadata)
+            with self._listing_cache_lock:
+                self._listing_cache[doc_id] = listing
+                if len(self._listing_cache) > self.LISTING_CACHE_SIZE:
+                    self._listing_cache.popitem(last=False)
+        return ScoredListing(listing, similarity)
+    
+    def _allowed_positions(self, where):
+        """
+        Mark the IVF positions of the listings matching a metadata filter
+        
+        Args:
+            where (dict): Chroma metadata filter
+            
+        Returns:
+            np.ndarray: Boolean mask indexed by IVF position
+        """
+        allowed = np.zeros(len(self.ivf_doc_ids), dtype=bool)
+        positions = [self.ivf_position_of.get(doc_id) for doc_id in self.vectordb.get(where=where, include=[])['ids']]
+        allowed[[position for position in positions if position is not None]] = True
+        return allowed
+    
+    def _ivf_positions(self, query_embedding, num_results, where=None):
+        """
+        Search the IVF index, optionally restricted by a metadata filter
+        
+        Args:
+            query_embedding (list): Embedding of the search query
+            num_results (int): Number of results to return
+            where (dict, optional): Chroma metadata filter, applied inside the probed lists
+            
+        Returns:
+            tuple: (IVF positions, cosine similarities) of the best matches
+        """
+        query_embedding = np.asarray(query_embedding, dtype=np.float32)
+        if not where:
+            return self.ivf_index.search(query_embedding, num_results)
+        
+        # Probe more lists until enough listings pass the filter (or every list has been scanned)
+        allowed = self._allowed_positions(where)
+        nprobe = self.ivf_index.nprobe
+        while True:
+            positions, scores = self.ivf_index.search(query_embedding, num_results, nprobe=nprobe, allowed=allowed)
+            if len(positions) >= min(num_results, allowed.sum()) or nprobe >= self.ivf_index.nlist:
+                return positions, scores
+            nprobe *= 2
+    
+    def _search_ivf(self, query_embedding, num_results, where=None):
+        """
+        Search the IVF index and look up the stored metadata of the results
+        
+        Args:
+            query_embedding (list): Embedding of the search query
+            num_results (int): Number of results to return
+            where (dict, optional): Chroma metadata filter, applied inside the probed lists
+            
+        Returns:
+            list: List of (document id, metadata, similarity) triples
+        """
+        positions, scores = self._ivf_positions(query_embedding, num_results, where)
+        
+        doc_ids = [self.ivf_doc_ids[position] for position in positions]
+        if not doc_ids:
+            return []
+        stored = self.vectordb.get(ids=doc_ids, include=['metadatas'])
+        metadata_by_id = dict(zip(stored['ids'], stored['metadatas']))
+        
+        # Report 1 - squared L2 distance like the Chroma backend (2 * cosine - 1 for unit-length embeddings);
+        # documents deleted from the database since the index was built are skipped
+        return [
+            (doc_id, metadata_by_id[doc_id], float(2 * score - 1))
+            for doc_id, score in zip(doc_ids, scores)
+            if doc_id in metadata_by_id
+        ]
+    
+    def _search_chroma(self, query_embedding, num_results, where=None):
+        """
+        Search Chroma by vector, optionally restricted by a metadata filter
+        
+        Args:
+            query_embedding (list): Embedding of the search query
+            num_results (int): Number of results to return
+            where (dict, optional): Chroma metadata filter
+            
+        Returns:
+            list: List of (document id, metadata, similarity) triples
+        """
+        results = self.vectordb._collection.query(
+            query_embeddings=[np.asarray(query_embedding, dtype=np.float32).tolist()],
+            n_results=num_results,
+            where=where,
+            include=['metadatas', 'distances']
         )
         
-        # Extract listings and scores
-        matches = []
-        for doc, score in results:
-            # Convert score to similarity (ChromaDB returns distance, lower is better)
-            similarity = 1 - score
+        # Convert score to similarity (ChromaDB returns distance, lower is better)
+        return [
+            (doc_id, metadata, 1 - distance)
+            for doc_id, metadata, distance in zip(results['ids'][0], results['metadatas'][0], results['distances'][0])
+        ]
+    
+    def rank_with_constraints(self, candidates, constraints):
+        """
+        Re-rank candidates so listings meeting the numeric constraints come first,
+        boosting listings that mention requested amenities
+        
+        Args:
+            candidates (list): List of (document id, metadata, similarity) triples
+            constraints (dict): Constraints from ConstraintExtractor
+            
+        Returns:
+            list: (document id, metadata, similarity) triples in ranking order, deduplicated by document id
+        """
+        amenities = set(constraints.get('amenities', []))
+        
+        ranked = []
+        seen = set()
+        for doc_id, metadata, similarity in candidates:
+            if doc_id in seen:
+                continue
+            seen.add(doc_id)
+            
+            boost = 0.0
+            if amenities:
+                text = metadata['description'] + " " + metadata['neighborhood_description']
+                boost = self.AMENITY_BOOST * len(amenities & find_amenities(text))
+            ranked.append((satisfies_constraints(metadata, constraints), similarity + boost, doc_id, metadata, similarity))
+        
+        ranked.sort(key=lambda item: (item[0], item[1]), reverse=True)
+        return [(doc_id, metadata, similarity) for _, _, doc_id, metadata, similarity in ranked]
+    
+    def search_candidates(self, query_embedding, num_candidates, constraints=None):
+        """
+        Fetch the nearest listings to a query embedding together with their stored embeddings
+        
+        Args:
+            query_embedding (list): Embedding of the search query
+            num_candidates (int): Number of candidates to fetch
+            constraints (dict, optional): Constraints from ConstraintExtractor; only listings meeting
+                the numeric ones are fetched
             
-            # Get listing details from document metadata
-            listing = {
-                'neighborhood': doc.metadata['neighborhood'],
-                'price': doc.metadata['price'],
-                'bedrooms': doc.metadata['bedrooms'],
-                'bathrooms': doc.metadata['bathrooms'],
-                'house_size': doc.metadata['house_size'],
-                'description': doc.metadata['description'],
-                'neighborhood_description': doc.metadata['neighborhood_description'],
-                'similarity_score': similarity
-            }
+        Returns:
+            tuple: (list of document ids, list of metadata, float32 array of embeddings)
+        """
+        if not self.vectordb:
+            raise ValueError("Vector database not initialized. Call initialize_with_listings first.")
+        
+        where = constraints_to_filter(constraints) if constraints else None
+        if self.index_backend == "ivf":
+            self.ensure_ivf_index()
+            positions, _ = self._ivf_positions(query_embedding, num_candidates, where)
+            doc_ids = [self.ivf_doc_ids[position] for position in positions]
+            if not doc_ids:
+                return [], [], np.empty((0, len(query_embedding)), dtype=np.float32)
+            stored = self.vectordb.get(ids=doc_ids, include=['metadatas', 'embeddings'])
+            order = {doc_id: i for i, doc_id in enumerate(stored['ids'])}
+            doc_ids = [doc_id for doc_id in doc_ids if doc_id in order]
+            metadatas = [stored['metadatas'][order[doc_id]] for doc_id in doc_ids]
+            embeddings = np.asarray(stored['embeddings'], dtype=np.float32).reshape(len(stored['ids']), -1)
+            embeddings = embeddings[[order[doc_id] for doc_id in doc_ids]]
+            return doc_ids, metadatas, embeddings
+        
+        results = self.vectordb._collection.query(
+            query_embeddings=[np.asarray(query_embedding, dtype=np.float32).tolist()],
+            n_results=num_candidates,
+            where=where,
+            include=['metadatas', 'embeddings']
+        )
+        doc_ids = results['ids'][0]
+        if not doc_ids:
+            return [], [], np.empty((0, len(query_embedding)), dtype=np.float32)
+        embeddings = np.asarray(results['embeddings'][0], dtype=np.float32).reshape(len(doc_ids), -1)
+        return doc_ids, results['metadatas'][0], embeddings
+    
+    def search(self, query, num_results=3, constraints=None):
+        """
+        Search for listings that match a query
+        
+        Args:
+            query (str): The search query
+            num_results (int): Number of results to return
+            constraints (dict, optional): Structured constraints from ConstraintExtractor; listings
+                meeting them are preferred and requested amenities boost the ranking
             
-            matches.append(listing)
+        Returns:
+            list: List of ScoredListing results
+        """
+        if not self.vectordb:
+            raise ValueError("Vector database not initialized. Call initialize_with_listings first.")
+        
+        if self.index_backend == "ivf":
+            self.ensure_ivf_index()
+        
+        query_embedding = self.embeddings.embed_query(query)
+        fetch_k = num_results * self.CONSTRAINT_FETCH_FACTOR if constraints else num_results
+        search_index = self._search_ivf if self.index_backend == "ivf" else self._search_chroma
+        
+        # Let the index apply the numeric constraints, topping up without them if too few listings pass
+        where = constraints_to_filter(constraints) if constraints else None
+        candidates = search_index(query_embedding, fetch_k, where) if where else []
+        if len(candidates) < num_results:
+            candidates += search_index(query_embedding, fetch_k)
+        
+        if constraints:
+            candidates = self.rank_with_constraints(candidates, constraints)
         
-        return matches
+        return [
+            self.listing_from_metadata(doc_id, metadata, similarity)
+            for doc_id, metadata, similarity in candidates[:num_results]
+        ]
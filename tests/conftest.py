@@ -0,0 +1,8 @@
+# Test configuration for HomeMatch
+
+import sys
+from pathlib import Path
+
+# Add project root to path to allow imports from other directories
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
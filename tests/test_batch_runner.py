@@ -0,0 +1,126 @@
+# Tests for checkpointed, idempotent batch runs
+
+import json
+import os
+
+import pandas as pd
+import pytest
+
+from models.batch_runner import BatchRunner
+from models.listing import Listing, ScoredListing
+
+
+class StubVectorDB:
+    """
+    Returns fixed results, failing for the buyers whose query contains a word in fail_on
+    """
+
+    def __init__(self, fail_on=()):
+        self.fail_on = set(fail_on)
+        self.queries = []
+
+    def search(self, query, num_results=3, constraints=None):
+        self.queries.append(query)
+        if self.fail_on & set(query.split()):
+            raise RuntimeError("search failed")
+        return [
+            ScoredListing(Listing(neighborhood=f"Area {i}", price="$500,000", listing_id=i), 1.0 - i / 10)
+            for i in range(num_results)
+        ]
+
+
+def write_buyers(path, count):
+    with open(path, 'w') as f:
+        for i in range(count):
+            f.write(json.dumps({'buyer_id': f"b{i}", 'preferences': [f"buyer{i}", "quiet street"]}) + "\n")
+    return str(path)
+
+
+def make_runner(vector_db, **kwargs):
+    kwargs.setdefault('flush_every', 4)
+    kwargs.setdefault('max_workers', 3)
+    return BatchRunner(vector_db, None, num_results=2, personalize=False, use_constraints=False, **kwargs)
+
+
+def read_results(output_dir):
+    parts = sorted(name for name in os.listdir(output_dir) if name.startswith("part-"))
+    return pd.concat([pd.read_parquet(os.path.join(output_dir, name)) for name in parts])
+
+
+def test_rerun_skips_completed_buyers(tmp_path):
+    input_file = write_buyers(tmp_path / "buyers.jsonl", 10)
+    output_dir = str(tmp_path / "out")
+
+    summary = make_runner(StubVectorDB()).run(input_file, output_dir)
+    assert summary['processed'] == 10
+
+    vector_db = StubVectorDB()
+    summary = make_runner(vector_db).run(input_file, output_dir)
+    assert summary['skipped'] == 10
+    assert summary['processed'] == 0
+    assert vector_db.queries == []
+
+    results = read_results(output_dir)
+    assert len(results) == 20
+    assert sorted(results.columns) == sorted(
+        ['buyer_id', 'rank', 'neighborhood', 'price', 'bedrooms', 'bathrooms', 'house_size',
+         'description', 'neighborhood_description', 'listing_id', 'similarity_score']
+    )
+
+
+def test_part_written_before_checkpoint_is_recovered(tmp_path, monkeypatch):
+    input_file = write_buyers(tmp_path / "buyers.jsonl", 10)
+    output_dir = str(tmp_path / "out")
+
+    runner = make_runner(StubVectorDB(), max_workers=1)
+    checkpoint = runner._checkpoint
+    calls = []
+
+    def crash_on_second_part(buyer_ids, directory, part_name=None):
+        calls.append(part_name)
+        if len(calls) == 2:
+            raise KeyboardInterrupt("crash before checkpointing")
+        checkpoint(buyer_ids, directory, part_name)
+
+    monkeypatch.setattr(runner, "_checkpoint", crash_on_second_part)
+    with pytest.raises(KeyboardInterrupt):
+        runner.run(input_file, output_dir)
+    assert len([name for name in os.listdir(output_dir) if name.startswith("part-")]) == 2
+    written = set(read_results(output_dir)['buyer_id'])
+
+    # A line torn by the crash is ignored
+    with open(os.path.join(output_dir, BatchRunner.CHECKPOINT_FILE), 'a') as f:
+        f.write('{"buyer_ids": ["b9"')
+
+    vector_db = StubVectorDB()
+    summary = make_runner(vector_db).run(input_file, output_dir)
+    assert summary['skipped'] == len(written)
+    assert summary['processed'] == 10 - len(written) > 0
+    assert len(vector_db.queries) == summary['processed']
+
+    results = read_results(output_dir)
+    assert len(results) == 20
+    assert results.groupby('buyer_id').size().max() == 2
+    assert set(results['buyer_id']) == {f"b{i}" for i in range(10)}
+
+
+def test_failed_buyers_are_retried(tmp_path):
+    input_file = write_buyers(tmp_path / "buyers.jsonl", 6)
+    output_dir = str(tmp_path / "out")
+
+    summary = make_runner(StubVectorDB(fail_on={"buyer2", "buyer5"})).run(input_file, output_dir)
+    assert summary['processed'] == 4
+    assert summary['failed'] == 2
+
+    summary = make_runner(StubVectorDB()).run(input_file, output_dir)
+    assert summary['skipped'] == 4
+    assert summary['processed'] == 2
+    assert summary['failed'] == 0
+
+    results = read_results(output_dir)
+    assert len(results) == 12
+    assert results.groupby('buyer_id').size().max() == 2
+    # Part numbering continues after the first run's files
+    assert sorted(name for name in os.listdir(output_dir) if name.startswith("part-")) == [
+        "part-00000.parquet", "part-00001.parquet"
+    ]
@@ -0,0 +1,149 @@
+# Tests for incremental search refinement in buyer sessions
+
+import zlib
+
+import numpy as np
+import pytest
+
+from models.buyer_session import BuyerSession
+from models.constraint_extractor import satisfies_constraints
+from models.ivf_index import normalize
+from models.listing import Listing, ScoredListing
+from models.vector_db import VectorDBManager
+
+DIM = 32
+WORDS = ["quiet", "park", "garden", "modern", "kitchen", "downtown", "school", "pool", "garage",
+         "cozy", "spacious", "view", "trail", "cafe", "transit", "family"]
+
+
+class StubEmbeddings:
+    """
+    Bag-of-words embedding with a fixed random vector per word
+    """
+
+    def embed_query(self, text):
+        vectors = [
+            np.random.default_rng(zlib.crc32(word.encode())).standard_normal(DIM)
+            for word in text.lower().split()
+        ]
+        return list(normalize(np.sum(vectors, axis=0)))
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+
+class StubVectorDB:
+    """
+    Exact in-memory search over listings with the VectorDBManager ranking rules
+    """
+
+    AMENITY_BOOST = VectorDBManager.AMENITY_BOOST
+    rank_with_constraints = VectorDBManager.rank_with_constraints
+
+    def __init__(self, num_listings=300, seed=0):
+        rng = np.random.default_rng(seed)
+        self.embeddings = StubEmbeddings()
+        self.doc_ids = [str(i) for i in range(num_listings)]
+        self.metadatas = []
+        texts = []
+        for i in range(num_listings):
+            words = rng.choice(WORDS, size=4, replace=False)
+            bedrooms = int(rng.integers(1, 6))
+            description = " ".join(words)
+            self.metadatas.append({
+                'id': i, 'description': description, 'neighborhood_description': "",
+                'bedrooms': str(bedrooms), 'bedrooms_value': bedrooms,
+            })
+            texts.append(description)
+        self.vectors = normalize(self.embeddings.embed_documents(texts))
+        self.fetches = 0
+
+    def search_candidates(self, query_embedding, num_candidates, constraints=None):
+        self.fetches += 1
+        keep = [
+            i for i, metadata in enumerate(self.metadatas)
+            if not constraints or satisfies_constraints(metadata, constraints)
+        ]
+        distances = np.linalg.norm(self.vectors[keep] - np.asarray(query_embedding), axis=1)
+        best = [keep[i] for i in np.argsort(distances, kind="stable")[:num_candidates]]
+        return (
+            [self.doc_ids[i] for i in best],
+            [self.metadatas[i] for i in best],
+            self.vectors[best].reshape(len(best), DIM)
+        )
+
+    def listing_from_metadata(self, doc_id, metadata, similarity):
+        return ScoredListing(Listing.from_metadata(metadata), similarity)
+
+
+def result_ids(results):
+    return [result.listing.listing_id for result in results]
+
+
+PREFERENCES = ["quiet park garden", "modern kitchen", "3 bedrooms"]
+
+
+def test_small_edit_is_served_from_cache():
+    vector_db = StubVectorDB()
+    session = BuyerSession(vector_db, PREFERENCES, num_results=3, overfetch=20)
+    session.search()
+
+    session.refine(1, "modern kitchen cozy")
+    assert session.stats == {'full_searches': 1, 'cached_refinements': 1, 'fallbacks': 0}
+    assert vector_db.fetches == 1
+
+
+def test_constraint_change_falls_back():
+    vector_db = StubVectorDB()
+    session = BuyerSession(vector_db, PREFERENCES, num_results=3, overfetch=20)
+    session.search()
+
+    results = session.refine(2, "4 bedrooms")
+    assert session.stats['fallbacks'] == 1
+    assert session.stats['cached_refinements'] == 0
+    assert all(result.listing.bedrooms_value >= 4 for result in results)
+
+
+def test_exhausted_pool_falls_back():
+    vector_db = StubVectorDB()
+    session = BuyerSession(vector_db, ["quiet park garden", "3 bedrooms"], num_results=3, overfetch=2)
+    session.search()
+
+    # The query moves far beyond the few cached candidates
+    session.refine(0, "downtown transit cafe")
+    assert session.stats['fallbacks'] == 1
+
+
+@pytest.mark.parametrize("edits, cached", [
+    ([(1, "modern kitchen cozy"), (0, "quiet park garden view"), (1, "modern kitchen cozy spacious")], 2),
+    ([(0, "quiet park"), (2, "at least 2 bedrooms"), (1, "modern kitchen pool")], 2),
+    ([(0, "downtown transit"), (1, "cafe school family"), (2, "2 to 3 bedrooms")], 0),
+])
+def test_exact_refinements_match_a_fresh_session(edits, cached):
+    vector_db = StubVectorDB()
+    session = BuyerSession(vector_db, PREFERENCES, num_results=3, overfetch=10, exact=True)
+    session.search()
+
+    preferences = list(PREFERENCES)
+    for index, answer in edits:
+        preferences[index] = answer
+        refined = session.refine(index, answer)
+        fresh = BuyerSession(vector_db, preferences, num_results=3, exact=True).search()
+        assert result_ids(refined) == result_ids(fresh)
+        assert [r.similarity_score for r in refined] == pytest.approx([r.similarity_score for r in fresh])
+    assert session.stats['cached_refinements'] == cached
+    assert session.stats['fallbacks'] == len(edits) - cached
+
+
+@pytest.mark.parametrize("radius, exhaustive, similarities, drift, exact, expected", [
+    (0.5, True, [0.1], 0.9, False, True),     # every listing in the pool is cached
+    (0.5, False, [], 0.9, False, True),       # nothing selected from the pool
+    (None, False, [0.9], 0.0, False, False),  # pool not fetched
+    (0.5, False, [0.9], 0.5, False, False),   # query moved past the pool radius
+    (0.5, False, [0.9], 0.1, False, True),    # approximate mode trusts a pool it is still inside
+    (1.0, False, [0.9], 0.1, True, True),     # 1 - 0.9 <= (1.0 - 0.1) ** 2
+    (0.5, False, [0.5], 0.1, True, False),    # 1 - 0.5 > (0.5 - 0.1) ** 2
+])
+def test_pool_covers(radius, exhaustive, similarities, drift, exact, expected):
+    session = BuyerSession(StubVectorDB(num_listings=5), ["quiet"], exact=exact)
+    assert session._pool_covers(radius, exhaustive, similarities, drift, 0.0) is expected
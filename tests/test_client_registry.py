@@ -0,0 +1,119 @@
+# Tests for the shared client registry against the local mock OpenAI server
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from utils import client_registry
+from utils.client_registry import CircuitBreaker, CircuitOpenError, ClientRegistry, RateLimiter
+from utils.mock_openai_server import create_mock_server
+
+
+@pytest.fixture
+def mock_server():
+    server = create_mock_server(window_seconds=1.0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def make_registry(server, **kwargs):
+    api_base = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    return ClientRegistry(api_key="test", api_base=api_base, **kwargs)
+
+
+def embed_many(registry, count, workers=8):
+    def embed(i):
+        try:
+            registry.openai_client.embeddings.create(input=[f"query {i}"], model="mock")
+            return "ok"
+        except Exception as error:
+            return type(error).__name__
+
+    with ThreadPoolExecutor(workers) as executor:
+        return list(executor.map(embed, range(count)))
+
+
+def test_throttling_backs_off_without_opening_the_circuit(mock_server):
+    mock_server.state.rpm_limit = 5
+    registry = make_registry(mock_server, failure_threshold=2)
+
+    results = embed_many(registry, 20)
+
+    stats = registry.get_stats()
+    assert results == ["ok"] * 20
+    assert mock_server.state.stats["rate_limited"] > 0
+    assert stats["throttled"] == mock_server.state.stats["rate_limited"]
+    assert stats["failures"] == 0
+    assert stats["circuit_opened"] == 0
+
+
+def test_connections_are_pooled(mock_server):
+    registry = make_registry(mock_server, max_connections=4)
+
+    embed_many(registry, 40, workers=4)
+
+    assert mock_server.state.stats["connections"] <= 4
+
+
+def test_open_circuit_waits_for_recovery(mock_server):
+    mock_server.state.failure_rate = 1.0
+    registry = make_registry(mock_server, failure_threshold=3, recovery_timeout=0.3)
+
+    def recover():
+        mock_server.state.failure_rate = 0.0
+
+    timer = threading.Timer(1.0, recover)
+    timer.start()
+    results = embed_many(registry, 8)
+    timer.join()
+
+    stats = registry.get_stats()
+    assert results == ["ok"] * 8
+    assert stats["circuit_opened"] >= 1
+    assert stats["circuit_state"] == CircuitBreaker.CLOSED
+
+
+def test_open_circuit_fails_after_wait_timeout(mock_server):
+    mock_server.state.failure_rate = 1.0
+    registry = make_registry(mock_server, max_retries=10, failure_threshold=2, recovery_timeout=60.0,
+                             circuit_wait_timeout=0.2)
+
+    assert embed_many(registry, 1) == ["APIConnectionError"]
+    assert registry.circuit_breaker.state == CircuitBreaker.OPEN
+    assert mock_server.state.stats["failed"] == 2
+
+
+def test_throttled_trial_request_keeps_circuit_half_open():
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=0.0)
+    breaker.record_failure()
+
+    breaker.before_request()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+
+    breaker.record_throttled()
+    breaker.before_request()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_pause_holds_requests_short_of_allowance(monkeypatch):
+    limiter = RateLimiter(requests_per_minute=600, tokens_per_minute=None)
+    for _ in range(600):
+        limiter.acquire()
+    limiter.pause(0.5)
+
+    sleeps = []
+    real_sleep = client_registry.time.sleep
+    monkeypatch.setattr(client_registry.time, "sleep", lambda seconds: (sleeps.append(seconds), real_sleep(seconds)))
+
+    # The pause is longer than the time to refill one request, so one sleep covers both
+    waited = limiter.acquire()
+    assert waited >= 0.45
+    assert len(sleeps) == 1
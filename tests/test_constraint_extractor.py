@@ -0,0 +1,89 @@
+# Tests for extracting structured constraints from preference answers
+
+import pytest
+
+from models.constraint_extractor import (
+    ConstraintExtractor, constraints_to_filter, find_amenities, merge_constraints, satisfies_constraints
+)
+
+
+@pytest.mark.parametrize("text, expected", [
+    # Room counts and ranges
+    ("A three-bedroom house", {'min_bedrooms': 3}),
+    ("at least 2 bedrooms", {'min_bedrooms': 2}),
+    ("3+ bedrooms", {'min_bedrooms': 3}),
+    ("3 to 4 bedrooms", {'min_bedrooms': 3, 'max_bedrooms': 4}),
+    ("2-3 bedrooms", {'min_bedrooms': 2, 'max_bedrooms': 3}),
+    ("two or three bedrooms", {'min_bedrooms': 2, 'max_bedrooms': 3}),
+    ("between 2 and 3 bedrooms", {'min_bedrooms': 2, 'max_bedrooms': 3}),
+    ("up to 4 bedrooms", {'max_bedrooms': 4}),
+    ("no more than 4 bedrooms", {'max_bedrooms': 4}),
+    # Amounts before a room count are not range starts
+    ("My budget is $750,000 and 3 bedrooms", {'min_bedrooms': 3, 'max_price': 750000}),
+    ("Budget under $900,000 and 2 baths", {'min_bathrooms': 2, 'max_price': 900000}),
+    ("$1.5M or 2 bedrooms", {'min_bedrooms': 2}),
+    ("budget 750000 and 3 bedrooms", {'min_bedrooms': 3, 'max_price': 750000}),
+    # Strict comparators on counts
+    ("fewer than 3 bedrooms", {'max_bedrooms': 2}),
+    ("less than 3 bedrooms", {'max_bedrooms': 2}),
+    ("more than 2 bedrooms", {'min_bedrooms': 3}),
+    ("more than 2 bathrooms", {'min_bathrooms': 2.5}),
+    ("2.5 baths", {'min_bathrooms': 2.5}),
+    # Prices
+    ("under $900k", {'max_price': 900000}),
+    ("no more than $1.2M", {'max_price': 1200000}),
+    ("between $700,000 and $900,000", {'min_price': 700000, 'max_price': 900000}),
+    ("$800-900k", {'min_price': 800000, 'max_price': 900000}),
+    ("at least $500,000", {'min_price': 500000}),
+    # Sizes
+    ("at least 2,000 sqft", {'min_size': 2000}),
+    ("under 1500 square feet", {'max_size': 1500}),
+    ("2000-2500 sq ft", {'min_size': 2000, 'max_size': 2500}),
+    # Amenities and negations
+    ("a big backyard and a garage", {'amenities': ['backyard', 'garage']}),
+    ("no pool please", {}),
+    ("without a garage", {}),
+    ("I don't need a gym", {}),
+    ("no pool, but a garden would be nice", {'amenities': ['garden']}),
+    ("no HOA and a pool", {'amenities': ['pool']}),
+    # Nothing to extract
+    ("A quiet, friendly neighborhood", {}),
+])
+def test_extract(text, expected):
+    assert ConstraintExtractor().extract(text) == expected
+
+
+def test_extract_all_keeps_tightest_bounds():
+    answers = ["3 bedrooms and 2 bathrooms", "under $900,000", "at least 4 bedrooms with a garage"]
+    assert ConstraintExtractor().extract_all(answers) == {
+        'min_bedrooms': 4, 'min_bathrooms': 2, 'max_price': 900000, 'amenities': ['garage']
+    }
+
+
+def test_merge_constraints():
+    merged = merge_constraints([{'max_price': 900000, 'amenities': ['pool']},
+                                {'max_price': 800000, 'amenities': ['garage']}])
+    assert merged == {'max_price': 800000, 'amenities': ['garage', 'pool']}
+
+
+@pytest.mark.parametrize("listing, expected", [
+    ({'price': '$850,000', 'bedrooms': '3', 'bathrooms': '2', 'house_size': '2,000 sqft'}, True),
+    ({'price': '$950,000', 'bedrooms': '3', 'bathrooms': '2', 'house_size': '2,000 sqft'}, False),
+    ({'price': '$850,000', 'bedrooms': '2', 'bathrooms': '2', 'house_size': '2,000 sqft'}, False),
+    ({'price': '', 'bedrooms': '3', 'bathrooms': '2', 'house_size': '2,000 sqft'}, False),
+])
+def test_satisfies_constraints(listing, expected):
+    assert satisfies_constraints(listing, {'min_bedrooms': 3, 'max_price': 900000}) is expected
+
+
+def test_constraints_to_filter():
+    assert constraints_to_filter({'amenities': ['pool']}) is None
+    assert constraints_to_filter({'min_bedrooms': 3}) == {'bedrooms_value': {'$gte': 3}}
+    assert constraints_to_filter({'min_bedrooms': 3, 'max_size': 2000}) == {
+        '$and': [{'bedrooms_value': {'$gte': 3}}, {'house_size_value': {'$lte': 2000}}]
+    }
+
+
+def test_find_amenities_in_descriptions():
+    text = "Features a fireplace and a swimming pool. No garage, but street parking is easy."
+    assert find_amenities(text) == {'fireplace', 'pool', 'parking'}
@@ -0,0 +1,77 @@
+# Tests for the inverted-file approximate nearest-neighbor index
+
+import numpy as np
+
+from models.ivf_index import IVFIndex, exact_search, normalize
+
+
+def random_vectors(n, d=16, seed=0):
+    return np.random.default_rng(seed).standard_normal((n, d)).astype(np.float32)
+
+
+def test_full_probe_matches_exact_search():
+    vectors = random_vectors(500)
+    ids = np.arange(500)
+    index = IVFIndex(nlist=16)
+    index.build(vectors, ids)
+
+    for query in random_vectors(20, seed=1):
+        found, scores = index.search(query, k=10, nprobe=index.nlist)
+        expected, expected_scores = exact_search(normalize(vectors), ids, query, 10)
+        assert list(found) == list(expected)
+        assert np.allclose(scores, expected_scores, atol=1e-5)
+
+
+def test_add_after_mmap_load_round_trips(tmp_path):
+    vectors = random_vectors(300, seed=2)
+    index = IVFIndex(nlist=8, compact_ratio=0.1)
+    index.build(vectors[:200], np.arange(200))
+    index.save(str(tmp_path))
+
+    loaded = IVFIndex.load(str(tmp_path), mmap=True)
+    loaded.add(vectors[200:210], np.arange(200, 210))
+    assert len(loaded.pending_ids) == 10
+    # Crossing compact_ratio merges the pending vectors into the memory-mapped main arrays
+    loaded.add(vectors[210:], np.arange(210, 300))
+    assert len(loaded.pending_ids) == 0
+    loaded.save(str(tmp_path))
+
+    reloaded = IVFIndex.load(str(tmp_path), mmap=True)
+    assert len(reloaded) == 300
+    assert sorted(reloaded.ids) == list(range(300))
+    for query in random_vectors(10, seed=3):
+        found, _ = reloaded.search(query, k=5, nprobe=reloaded.nlist)
+        expected, _ = exact_search(normalize(vectors), np.arange(300), query, 5)
+        assert list(found) == list(expected)
+
+
+def test_pending_vectors_survive_save_and_load(tmp_path):
+    vectors = random_vectors(110, seed=4)
+    index = IVFIndex(nlist=4, compact_ratio=0.5)
+    index.build(vectors[:100], np.arange(100))
+    index.add(vectors[100:], np.arange(100, 110))
+    index.save(str(tmp_path))
+
+    loaded = IVFIndex.load(str(tmp_path))
+    assert list(loaded.pending_ids) == list(range(100, 110))
+    found, _ = loaded.search(vectors[105], k=1, nprobe=loaded.nlist)
+    assert list(found) == [105]
+
+
+def test_filtered_search_returns_only_allowed_ids():
+    vectors = random_vectors(400, seed=5)
+    index = IVFIndex(nlist=8, compact_ratio=1.0)
+    index.build(vectors[:350], np.arange(350))
+    index.add(vectors[350:], np.arange(350, 400))
+
+    allowed = np.zeros(400, dtype=bool)
+    allowed[::7] = True
+    for query in random_vectors(10, seed=6):
+        found, _ = index.search(query, k=10, nprobe=index.nlist, allowed=allowed)
+        assert len(found) == 10
+        assert allowed[found].all()
+        expected, _ = exact_search(normalize(vectors[allowed]), np.flatnonzero(allowed), query, 10)
+        assert list(found) == list(expected)
+
+    found, _ = index.search(vectors[0], k=5, allowed=np.zeros(400, dtype=bool))
+    assert len(found) == 0
@@ -0,0 +1,37 @@
+# Tests for the listing record types
+
+import pytest
+
+from models.listing import Listing, ScoredListing
+
+
+@pytest.mark.parametrize("data, values", [
+    ({'price': "$850,000", 'bedrooms': "3", 'bathrooms': "2.5", 'house_size': "2,500 sqft"},
+     (850000, 3, 2.5, 2500)),
+    ({'price': "$800,000 - $900,000", 'bedrooms': "Studio", 'bathrooms': "1 full, 1 half", 'house_size': ""},
+     (800000, None, 1, None)),
+    ({'price': "$1.2M", 'bedrooms': 4, 'bathrooms': None, 'house_size': "about 1800 square feet"},
+     (1200000, 4, None, 1800)),
+])
+def test_display_strings_round_trip(data, values):
+    data = dict(data, neighborhood="Green Oaks", description="A home", neighborhood_description="Quiet")
+    listing = Listing.from_dict(data)
+
+    expected = {field: '' if value is None else str(value) for field, value in data.items()}
+    assert listing.to_dict() == expected
+    assert (listing.price_value, listing.bedrooms_value, listing.bathrooms_value, listing.house_size_value) == values
+
+    stored = Listing.from_metadata(listing.with_listing_id(7).to_metadata())
+    assert stored.to_dict() == expected
+    assert stored.listing_id == 7
+    assert stored == listing.with_listing_id(7)
+
+
+def test_scored_listing_shares_listing():
+    listing = Listing.from_dict({'neighborhood': "Green Oaks", 'price': "$850,000"}, listing_id=3)
+    result = ScoredListing(listing, 0.9).with_personalized_description("Tailored")
+
+    assert result.listing is listing
+    assert result['price'] == "$850,000"
+    assert result.to_dict()['listing_id'] == 3
+    assert result['personalized_description'] == "Tailored"
@@ -0,0 +1,62 @@
+# Tests for the precomputed "more like this" similarity graph
+
+import numpy as np
+
+from models.similarity_graph import SimilarityGraph
+
+
+def exact_neighbors(embeddings, k):
+    normalized = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+    similarities = normalized @ normalized.T
+    np.fill_diagonal(similarities, -np.inf)
+    return np.argsort(-similarities, axis=1)[:, :k]
+
+
+def random_embeddings(n, d=16, seed=0):
+    return np.random.default_rng(seed).standard_normal((n, d)).astype(np.float32)
+
+
+def test_build_matches_exact_search():
+    embeddings = random_embeddings(200)
+    graph = SimilarityGraph(k=5, max_block_elements=1000)
+    graph.build(embeddings)
+
+    expected = exact_neighbors(embeddings, 5)
+    for row in range(len(embeddings)):
+        neighbors, scores = graph.similar_to(row)
+        assert list(neighbors) == list(expected[row])
+        assert row not in neighbors
+        assert np.all(np.diff(scores) <= 0)
+
+
+def test_add_matches_rebuild():
+    embeddings = random_embeddings(150, seed=1)
+    graph = SimilarityGraph(k=5, max_block_elements=1000)
+    graph.build(embeddings[:100])
+    graph.add(embeddings[100:130], embeddings[:100])
+    graph.add(embeddings[130:], embeddings[:130])
+
+    expected = exact_neighbors(embeddings, 5)
+    assert len(graph) == 150
+    for row in range(len(embeddings)):
+        assert list(graph.similar_to(row)[0]) == list(expected[row])
+
+
+def test_similar_to_pads_and_truncates():
+    graph = SimilarityGraph(k=5)
+    graph.build(random_embeddings(3))
+
+    assert len(graph.similar_to(0)[0]) == 2
+    assert len(graph.similar_to(0, k=1)[0]) == 1
+
+
+def test_save_and_load(tmp_path):
+    embeddings = random_embeddings(50, seed=2)
+    graph = SimilarityGraph(k=4)
+    graph.build(embeddings)
+    graph.save(str(tmp_path))
+
+    loaded = SimilarityGraph.load(str(tmp_path))
+    assert loaded.k == 4
+    assert np.array_equal(loaded.neighbors, graph.neighbors)
+    assert np.array_equal(loaded.scores, graph.scores)
@@ -1,10 +1,15 @@
 # HomeMatch Utils
 # This file makes the directory a Python package
 
-from .helpers import setup_environment, create_directory_if_not_exists, display_listing
+from .helpers import setup_environment, create_directory_if_not_exists, display_listing, parse_numeric
+from .client_registry import ClientRegistry, get_client_registry, reset_client_registry
 
 __all__ = [
     'setup_environment',
     'create_directory_if_not_exists',
-    'display_listing'
+    'display_listing',
+    'parse_numeric',
+    'ClientRegistry',
+    'get_client_registry',
+    'reset_client_registry'
 ]
@@ -0,0 +1,515 @@
+# Client Registry Module
+# Responsible for sharing one pooled, rate-limited HTTP client between all LLM and embedding users
+
+import os
+import json
+import time
+import random
+import threading
+
+import httpx
+import openai
+from langchain_community.llms import OpenAI
+from langchain_community.embeddings.openai import OpenAIEmbeddings
+
+DEFAULT_API_BASE = "https://openai.vocareum.com/v1"
+
+# Status code for provider throttling, handled by backing off rather than by the circuit breaker
+THROTTLED_STATUS_CODE = 429
+
+# Status codes that indicate the provider is temporarily failing
+RETRYABLE_STATUS_CODES = {THROTTLED_STATUS_CODE, 500, 502, 503, 504}
+
+
+class CircuitOpenError(httpx.TransportError):
+    """
+    Raised when a request is rejected because the circuit breaker is open.
+    """
+
+
+class RateLimiter:
+    """
+    Global requests-per-minute and tokens-per-minute limiter based on two token buckets.
+    """
+
+    def __init__(self, requests_per_minute=3000, tokens_per_minute=250000):
+        """
+        Initialize the RateLimiter.
+
+        Args:
+            requests_per_minute (int): Maximum number of requests per minute (None disables the limit)
+            tokens_per_minute (int): Maximum number of tokens per minute (None disables the limit)
+        """
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._request_allowance = float(requests_per_minute or 0)
+        self._token_allowance = float(tokens_per_minute or 0)
+        self._last_refill = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        self.total_wait_seconds = 0.0
+
+    def _refill(self, now):
+        """
+        Refill both buckets for the time elapsed since the last refill
+        """
+        elapsed = now - self._last_refill
+        self._last_refill = now
+        if self.requests_per_minute:
+            self._request_allowance = min(
+                float(self.requests_per_minute),
+                self._request_allowance + elapsed * self.requests_per_minute / 60.0
+            )
+        if self.tokens_per_minute:
+            self._token_allowance = min(
+                float(self.tokens_per_minute),
+                self._token_allowance + elapsed * self.tokens_per_minute / 60.0
+            )
+
+    def pause(self, seconds):
+        """
+        Hold back all requests for a while, e.g. after the provider answered with 429
+
+        Args:
+            seconds (float): Seconds to pause for
+        """
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def acquire(self, tokens=1):
+        """
+        Block until one request carrying the given number of tokens may be sent
+
+        Args:
+            tokens (int): Estimated number of tokens used by the request
+
+        Returns:
+            float: Seconds spent waiting
+        """
+        if self.tokens_per_minute:
+            # A single oversized request must still be able to pass eventually
+            tokens = min(tokens, self.tokens_per_minute)
+
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+
+                wait = self._paused_until - now
+                if self.requests_per_minute and self._request_allowance < 1:
+                    wait = max(wait, (1 - self._request_allowance) * 60.0 / self.requests_per_minute)
+                if self.tokens_per_minute and self._token_allowance < tokens:
+                    wait = max(wait, (tokens - self._token_allowance) * 60.0 / self.tokens_per_minute)
+
+                if wait <= 0:
+                    if self.requests_per_minute:
+                        self._request_allowance -= 1
+                    if self.tokens_per_minute:
+                        self._token_allowance -= tokens
+                    self.total_wait_seconds += waited
+                    return waited
+
+            time.sleep(wait)
+            waited += wait
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker that stops sending requests after repeated provider failures.
+
+    Requests arriving while the circuit is open (or while the half-open trial request is in
+    flight) wait for it to recover, up to a timeout, instead of failing immediately.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=5, recovery_timeout=30.0):
+        """
+        Initialize the CircuitBreaker.
+
+        Args:
+            failure_threshold (int): Consecutive failures before the circuit opens
+            recovery_timeout (float): Seconds to wait before letting a trial request through
+        """
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.times_opened = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._condition = threading.Condition()
+
+    def before_request(self, timeout=0.0):
+        """
+        Wait until a request may be sent
+
+        Args:
+            timeout (float): Maximum seconds to wait for the circuit to recover (None waits forever)
+
+        Raises:
+            CircuitOpenError: If the circuit does not let the request through within the timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                wait = None
+                if self.state == self.OPEN:
+                    wait = self._opened_at + self.recovery_timeout - now
+                    if wait <= 0:
+                        self.state = self.HALF_OPEN
+                        self._trial_in_flight = False
+
+                if self.state == self.HALF_OPEN:
+                    if not self._trial_in_flight:
+                        self._trial_in_flight = True
+                        return
+                    # Woken up when the trial request finishes
+                    wait = self.recovery_timeout
+                elif self.state == self.CLOSED:
+                    return
+
+                if deadline is not None:
+                    if now >= deadline:
+                        raise CircuitOpenError(
+                            f"Circuit breaker is {self.state}; the provider is failing repeatedly."
+                        )
+                    wait = min(wait, deadline - now)
+                self._condition.wait(wait)
+
+    def record_success(self):
+        """
+        Record a successful request and close the circuit
+        """
+        with self._condition:
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self._trial_in_flight = False
+            self._condition.notify_all()
+
+    def record_throttled(self):
+        """
+        Record a throttled request, which neither counts as a failure nor closes the circuit
+        """
+        with self._condition:
+            if self._trial_in_flight:
+                self._trial_in_flight = False
+                self._condition.notify_all()
+
+    def record_failure(self):
+        """
+        Record a failed request and open the circuit if the threshold is reached
+        """
+        with self._condition:
+            self.consecutive_failures += 1
+            self._trial_in_flight = False
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.times_opened += 1
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+            self._condition.notify_all()
+
+
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter, honoring Retry-After headers.
+    """
+
+    def __init__(self, max_retries=5, max_throttle_retries=20, base_delay=0.5, max_delay=20.0):
+        """
+        Initialize the RetryPolicy.
+
+        Args:
+            max_retries (int): Maximum number of retries after failures (5xx and transport errors)
+            max_throttle_retries (int): Maximum number of retries after 429 responses
+            base_delay (float): Delay in seconds before the first retry
+            max_delay (float): Upper bound for a single delay in seconds
+        """
+        self.max_retries = max_retries
+        self.max_throttle_retries = max_throttle_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt, response=None):
+        """
+        Compute how long to wait before the next attempt
+
+        Args:
+            attempt (int): Zero-based index of the attempt that just failed
+            response (httpx.Response, optional): Failed response, if any
+
+        Returns:
+            float: Delay in seconds
+        """
+        if response is not None:
+            retry_after = response.headers.get("retry-after")
+            if retry_after:
+                try:
+                    return min(float(retry_after), self.max_delay)
+                except ValueError:
+                    pass
+
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+
+def estimate_request_tokens(request):
+    """
+    Roughly estimate the tokens an OpenAI request will consume
+
+    Args:
+        request (httpx.Request): Outgoing request
+
+    Returns:
+        int: Estimated token count (prompt plus requested completion)
+    """
+    content = request.content or b""
+    # Roughly four bytes of JSON per prompt token
+    tokens = len(content) // 4 + 1
+    try:
+        body = json.loads(content)
+        tokens += int(body.get("max_tokens") or 0)
+    except (ValueError, AttributeError, TypeError):
+        pass
+    return tokens
+
+
+class ResilientTransport(httpx.BaseTransport):
+    """
+    HTTP transport with keep-alive pooling, global rate limiting, retries and a circuit breaker.
+
+    429 responses pause the shared rate limiter and are retried; only 5xx responses and
+    transport errors count towards opening the circuit breaker.
+    """
+
+    def __init__(self, rate_limiter, circuit_breaker, retry_policy, limits=None, circuit_wait_timeout=120.0):
+        """
+        Initialize the ResilientTransport.
+
+        Args:
+            rate_limiter (RateLimiter): Shared rate limiter
+            circuit_breaker (CircuitBreaker): Shared circuit breaker
+            retry_policy (RetryPolicy): Retry policy for failed requests
+            limits (httpx.Limits, optional): Connection pool limits
+            circuit_wait_timeout (float): Seconds a request waits for an open circuit to recover
+        """
+        self.rate_limiter = rate_limiter
+        self.circuit_breaker = circuit_breaker
+        self.retry_policy = retry_policy
+        self.circuit_wait_timeout = circuit_wait_timeout
+        self._transport = httpx.HTTPTransport(limits=limits or httpx.Limits())
+        self._stats_lock = threading.Lock()
+        self.stats = {"requests": 0, "retries": 0, "throttled": 0, "failures": 0}
+
+    def _count(self, key):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def handle_request(self, request):
+        """
+        Send a request through the pool, waiting for the limiter and retrying on failure
+
+        Args:
+            request (httpx.Request): Outgoing request
+
+        Returns:
+            httpx.Response: Response from the provider
+        """
+        tokens = estimate_request_tokens(request)
+        attempt = 0
+        throttled_attempt = 0
+        while True:
+            self.circuit_breaker.before_request(timeout=self.circuit_wait_timeout)
+            self.rate_limiter.acquire(tokens)
+            self._count("requests")
+
+            try:
+                response = self._transport.handle_request(request)
+            except httpx.TransportError:
+                self.circuit_breaker.record_failure()
+                self._count("failures")
+                if attempt >= self.retry_policy.max_retries:
+                    raise
+                time.sleep(self.retry_policy.delay(attempt))
+                attempt += 1
+                self._count("retries")
+                continue
+
+            if response.status_code not in RETRYABLE_STATUS_CODES:
+                self.circuit_breaker.record_success()
+                return response
+
+            if response.status_code == THROTTLED_STATUS_CODE:
+                # The provider is healthy but over its limit: slow every caller down instead of failing
+                self.circuit_breaker.record_throttled()
+                self._count("throttled")
+                if throttled_attempt >= self.retry_policy.max_throttle_retries:
+                    return response
+                delay = self.retry_policy.delay(throttled_attempt, response)
+                self.rate_limiter.pause(delay)
+                throttled_attempt += 1
+            else:
+                self.circuit_breaker.record_failure()
+                self._count("failures")
+                if attempt >= self.retry_policy.max_retries:
+                    return response
+                delay = self.retry_policy.delay(attempt, response)
+                attempt += 1
+
+            # Release the connection back to the pool before sleeping
+            response.read()
+            response.close()
+            time.sleep(delay)
+            self._count("retries")
+
+    def close(self):
+        """
+        Close all pooled connections
+        """
+        self._transport.close()
+
+
+class ClientRegistry:
+    """
+    Registry that hands out LLM and embedding clients sharing one pooled HTTP client.
+    """
+
+    def __init__(self, api_key=None, api_base=None, requests_per_minute=3000, tokens_per_minute=250000,
+                 max_connections=20, max_keepalive_connections=10, keepalive_expiry=30.0,
+                 max_retries=5, max_throttle_retries=20, failure_threshold=5, recovery_timeout=30.0,
+                 circuit_wait_timeout=120.0, timeout=60.0):
+        """
+        Initialize the ClientRegistry.
+
+        Args:
+            api_key (str, optional): OpenAI API key (defaults to OPENAI_API_KEY)
+            api_base (str, optional): OpenAI API base URL (defaults to OPENAI_API_BASE)
+            requests_per_minute (int): Global request limit per minute
+            tokens_per_minute (int): Global token limit per minute
+            max_connections (int): Maximum number of open connections
+            max_keepalive_connections (int): Maximum number of idle keep-alive connections
+            keepalive_expiry (float): Seconds an idle connection is kept open
+            max_retries (int): Maximum retries per request after 5xx responses or transport errors
+            max_throttle_retries (int): Maximum retries per request after 429 responses
+            failure_threshold (int): Consecutive failures before the circuit opens
+            recovery_timeout (float): Seconds before the circuit lets a trial request through
+            circuit_wait_timeout (float): Seconds a request waits for an open circuit before failing
+            timeout (float): Request timeout in seconds
+        """
+        self.api_key = api_key or os.environ.get("OPENAI_API_KEY")
+        self.api_base = api_base or os.environ.get("OPENAI_API_BASE", DEFAULT_API_BASE)
+
+        self.rate_limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+        self.circuit_breaker = CircuitBreaker(failure_threshold, recovery_timeout)
+        self.retry_policy = RetryPolicy(max_retries=max_retries, max_throttle_retries=max_throttle_retries)
+        self.transport = ResilientTransport(
+            self.rate_limiter,
+            self.circuit_breaker,
+            self.retry_policy,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+                keepalive_expiry=keepalive_expiry
+            ),
+            circuit_wait_timeout=circuit_wait_timeout
+        )
+        self.http_client = httpx.Client(transport=self.transport, timeout=timeout)
+
+        # Retries are handled by the shared transport. LangChain would build an async client from
+        # a sync http_client and fail, so both OpenAI clients are passed in explicitly; the
+        # application only makes synchronous calls, which all go through the transport.
+        self.openai_client = openai.OpenAI(
+            api_key=self.api_key, base_url=self.api_base, http_client=self.http_client, max_retries=0
+        )
+        self.async_openai_client = openai.AsyncOpenAI(
+            api_key=self.api_key, base_url=self.api_base, timeout=timeout, max_retries=0
+        )
+
+    def get_llm(self, temperature=0.7):
+        """
+        Create an LLM client that uses the shared HTTP client
+
+        Args:
+            temperature (float): The temperature for the LLM
+
+        Returns:
+            OpenAI: LangChain OpenAI LLM
+        """
+        return OpenAI(
+            temperature=temperature,
+            openai_api_key=self.api_key,
+            openai_api_base=self.api_base,
+            client=self.openai_client.completions,
+            async_client=self.async_openai_client.completions,
+            max_retries=0
+        )
+
+    def get_embeddings(self):
+        """
+        Create an embeddings client that uses the shared HTTP client
+
+        Returns:
+            OpenAIEmbeddings: LangChain OpenAI embeddings
+        """
+        return OpenAIEmbeddings(
+            openai_api_key=self.api_key,
+            openai_api_base=self.api_base,
+            client=self.openai_client.embeddings,
+            async_client=self.async_openai_client.embeddings,
+            max_retries=0
+        )
+
+    def get_stats(self):
+        """
+        Get request, retry and throttling statistics
+
+        Returns:
+            dict: Statistics for the shared client
+        """
+        stats = dict(self.transport.stats)
+        stats["rate_limit_wait_seconds"] = round(self.rate_limiter.total_wait_seconds, 3)
+        stats["circuit_state"] = self.circuit_breaker.state
+        stats["circuit_opened"] = self.circuit_breaker.times_opened
+        return stats
+
+    def close(self):
+        """
+        Close the shared HTTP client and its connections
+        """
+        self.http_client.close()
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_client_registry(**kwargs):
+    """
+    Get the process-wide client registry, creating it on first use
+
+    Args:
+        **kwargs: Arguments for ClientRegistry, used only when the registry is created
+
+    Returns:
+        ClientRegistry: The shared client registry
+    """
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ClientRegistry(**kwargs)
+        return _registry
+
+
+def reset_client_registry():
+    """
+    Close and discard the process-wide client registry (e.g. after changing the API settings)
+    """
+    global _registry
+    with _registry_lock:
+        if _registry is not None:
+            _registry.close()
+        _registry = None
@@ -1,6 +1,7 @@
 # Utility functions for HomeMatch application
 
 import os
+import re
 from dotenv import load_dotenv
 
 def setup_environment():
@@ -13,21 +14,15 @@ def setup_environment():
     # Load environment variables from .env file
     load_dotenv()
     
-    # Set up OpenAI API base URL and key for Vocareum
-    import openai
-    
-    # Set OpenAI API base URL and key
-    openai.api_base = "https://openai.vocareum.com/v1"
-    
     # Check if OpenAI API key is set
     api_key = os.environ.get("OPENAI_API_KEY")
     if not api_key:
         print("WARNING: OpenAI API key not found. Please set it in .env file.")
         return False
     
-    # Set the API key
-    openai.api_key = api_key
-    os.environ["OPENAI_API_BASE"] = "https://openai.vocareum.com/v1"
+    # Default to the Vocareum endpoint unless another base URL (e.g. a local mock server) is configured.
+    # The clients themselves are created by utils.client_registry, so no global openai state is touched.
+    os.environ.setdefault("OPENAI_API_BASE", "https://openai.vocareum.com/v1")
     
     return True
 
@@ -47,21 +42,45 @@ def display_listing(listing, index=None):
     Display a real estate listing with formatting
     
     Args:
-        listing (dict): Dictionary containing listing details
+        listing (Listing): Listing, ScoredListing or listing dictionary
         index (int, optional): Index of the listing
     """
+    # Imported here because models depends on this module
+    from models.listing import LISTING_LABELS
+    
     if index is not None:
         print(f"Listing {index}:")
     
-    print(f"Neighborhood: {listing['neighborhood']}")
-    print(f"Price: {listing['price']}")
-    print(f"Bedrooms: {listing['bedrooms']}")
-    print(f"Bathrooms: {listing['bathrooms']}")
-    print(f"House Size: {listing['house_size']}")
-    print(f"Description: {listing['description']}")
-    print(f"Neighborhood Description: {listing['neighborhood_description']}")
+    for field, label in LISTING_LABELS.items():
+        print(f"{label}: {listing[field]}")
     
     if 'similarity_score' in listing:
         print(f"Similarity Score: {listing['similarity_score']:.4f}")
     
     print("-" * 80)
+
+_NUMBER_PATTERN = re.compile(r"(\d[\d,]*(?:\.\d+)?)(?:\s*(k|mm|m|million|thousand)\b)?", re.IGNORECASE)
+_NUMBER_MULTIPLIERS = {'k': 1e3, 'thousand': 1e3, 'm': 1e6, 'mm': 1e6, 'million': 1e6}
+
+def parse_numeric(value):
+    """
+    Parse the first number in a listing field such as "$850,000", "2,500 sqft" or "$1.2M"
+    
+    Args:
+        value: Field value (string or number)
+        
+    Returns:
+        float: Parsed number, or None if the value holds no number
+    """
+    if isinstance(value, (int, float)):
+        return float(value)
+    if not value:
+        return None
+    
+    match = _NUMBER_PATTERN.search(str(value))
+    if not match:
+        return None
+    
+    number = float(match.group(1).replace(",", ""))
+    suffix = (match.group(2) or "").lower()
+    return number * _NUMBER_MULTIPLIERS.get(suffix, 1)
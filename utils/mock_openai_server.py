@@ -0,0 +1,214 @@
+# Mock OpenAI Server Module
+# Responsible for serving fake completions and embeddings locally to test rate limits and connection pooling
+#
+# Usage:
+#   python -m utils.mock_openai_server --port 8008 --rpm-limit 60 --failure-rate 0.1
+#   OPENAI_API_BASE=http://127.0.0.1:8008/v1 python main.py
+
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class MockOpenAIState:
+    """
+    Shared counters and limits for the mock server.
+    """
+
+    def __init__(self, rpm_limit=None, failure_rate=0.0, latency=0.0, embedding_dim=1536, window_seconds=60.0):
+        """
+        Initialize the MockOpenAIState.
+
+        Args:
+            rpm_limit (int, optional): Requests per window before answering with 429
+            failure_rate (float): Fraction of requests answered with a random 503
+            latency (float): Artificial latency per request in seconds
+            embedding_dim (int): Dimension of the returned embeddings
+            window_seconds (float): Length of the rate limit window (shorten it to speed up tests)
+        """
+        self.rpm_limit = rpm_limit
+        self.window_seconds = window_seconds
+        self.failure_rate = failure_rate
+        self.latency = latency
+        self.embedding_dim = embedding_dim
+        self.lock = threading.Lock()
+        self.request_times = []
+        self.stats = {"connections": 0, "requests": 0, "rate_limited": 0, "failed": 0}
+
+    def admit(self):
+        """
+        Count a request and decide how to answer it
+
+        Returns:
+            tuple: (HTTP status code to answer with (200, 429 or 503), seconds until the limit frees up)
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.stats["requests"] += 1
+            self.request_times = [t for t in self.request_times if now - t < self.window_seconds]
+            if self.rpm_limit and len(self.request_times) >= self.rpm_limit:
+                self.stats["rate_limited"] += 1
+                return 429, self.request_times[0] + self.window_seconds - now
+            self.request_times.append(now)
+            if self.failure_rate and random.random() < self.failure_rate:
+                self.stats["failed"] += 1
+                return 503, 0.0
+            return 200, 0.0
+
+
+def mock_embedding(item, dim):
+    """
+    Build a deterministic unit-length embedding for an input item
+
+    Args:
+        item: Input string or list of token ids
+        dim (int): Embedding dimension
+
+    Returns:
+        list: Embedding vector
+    """
+    seed = int(hashlib.md5(json.dumps(item).encode("utf-8")).hexdigest()[:8], 16)
+    rng = random.Random(seed)
+    vector = [rng.gauss(0, 1) for _ in range(dim)]
+    norm = sum(v * v for v in vector) ** 0.5
+    return [v / norm for v in vector]
+
+
+class MockOpenAIHandler(BaseHTTPRequestHandler):
+    """
+    Request handler implementing the completions and embeddings endpoints.
+    """
+
+    # HTTP/1.1 keeps connections alive so client-side pooling is observable
+    protocol_version = "HTTP/1.1"
+    state = None
+
+    def setup(self):
+        super().setup()
+        with self.state.lock:
+            self.state.stats["connections"] += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/stats":
+            with self.state.lock:
+                self._send_json(200, dict(self.state.stats))
+        else:
+            self._send_json(404, {"error": {"message": "Not found"}})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+
+        if self.state.latency:
+            time.sleep(self.state.latency)
+
+        status, retry_after = self.state.admit()
+        if status == 429:
+            self._send_json(429, {"error": {"message": "Rate limit reached", "type": "requests"}},
+                            headers={"Retry-After": f"{max(retry_after, 0.0):.3f}"})
+            return
+        if status == 503:
+            self._send_json(503, {"error": {"message": "Service unavailable", "type": "server_error"}})
+            return
+
+        model = body.get("model", "mock-model")
+        if self.path.endswith("/embeddings"):
+            inputs = body.get("input", [])
+            if not isinstance(inputs, list) or (inputs and isinstance(inputs[0], int)):
+                inputs = [inputs]
+            data = [
+                {"object": "embedding", "index": i, "embedding": mock_embedding(item, self.state.embedding_dim)}
+                for i, item in enumerate(inputs)
+            ]
+            self._send_json(200, {
+                "object": "list",
+                "data": data,
+                "model": model,
+                "usage": {"prompt_tokens": len(inputs), "total_tokens": len(inputs)}
+            })
+        elif self.path.endswith("/completions"):
+            prompts = body.get("prompt", [""])
+            if not isinstance(prompts, list):
+                prompts = [prompts]
+            choices = [
+                {"text": "Mock completion.", "index": i, "logprobs": None, "finish_reason": "stop"}
+                for i in range(len(prompts))
+            ]
+            self._send_json(200, {
+                "id": "cmpl-mock",
+                "object": "text_completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": choices,
+                "usage": {"prompt_tokens": 1, "completion_tokens": 3, "total_tokens": 4}
+            })
+        else:
+            self._send_json(404, {"error": {"message": "Not found"}})
+
+
+def create_mock_server(host="127.0.0.1", port=0, **state_kwargs):
+    """
+    Create a mock OpenAI server (call serve_forever() or run it in a thread)
+
+    Args:
+        host (str): Host to bind to
+        port (int): Port to bind to (0 picks a free port)
+        **state_kwargs: Arguments for MockOpenAIState
+
+    Returns:
+        ThreadingHTTPServer: The server, with its state available as server.state
+    """
+    state = MockOpenAIState(**state_kwargs)
+    handler = type("BoundMockOpenAIHandler", (MockOpenAIHandler,), {"state": state})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.state = state
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local mock OpenAI API server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8008)
+    parser.add_argument("--rpm-limit", type=int, default=None, help="Requests per minute before 429s")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Fraction of requests answered with 503")
+    parser.add_argument("--latency", type=float, default=0.0, help="Artificial latency per request in seconds")
+    parser.add_argument("--embedding-dim", type=int, default=1536)
+    args = parser.parse_args()
+
+    server = create_mock_server(
+        args.host, args.port,
+        rpm_limit=args.rpm_limit,
+        failure_rate=args.failure_rate,
+        latency=args.latency,
+        embedding_dim=args.embedding_dim
+    )
+    print(f"Mock OpenAI server listening on http://{args.host}:{server.server_address[1]}/v1")
+    print("Counters are available at /stats")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()